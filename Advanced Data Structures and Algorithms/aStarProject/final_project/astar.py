@@ -1,7 +1,11 @@
 import graph as g
-import weighted_graph as wg
 import sys
 
+import heuristics
+import map_file
+from indexed_heap import DenseIndexedHeap, IndexedHeap
+from landmarks import fingerprint
+
 # FRANCE.MAP
 data = """
 Calais        -200    1200
@@ -101,49 +105,27 @@ Moulins       0       0
 Nice          750
 """
 
-# Make a weighted graph of the map
-graph = wg.WeightedGraph()
-
-cities = ['Calais', 'Nancy', 'Paris', 'Caen', 'Rennes', 'Brest', 'Nantes', 'Dijon', 
-          'Limoges', 'Lyon', 'Strasbourg', 'Bordeaux', 'Toulouse', 'Montpellier', 'Avignon', 
-          'Marseille', 'Nice', 'Moulins']
-
-for city in cities:
-    graph.add_vertex(city)
-    
-# Add edges according to data
-data = data.strip().split('\n\n')
-for entry in data:
-    lines = entry.strip().split('\n')
-    city = lines[0].split()[0]
-    graph.add_vertex(city)
-    for line in lines[1:]:
-        parts = line.split()
-        neighbor = parts[0]
-        distance = int(parts[1])
-        graph.add_edge(city, neighbor, distance)
-
 # ------------------------------------------------------------------------------------------------------------------
 # graph.display()
-# Calais -> [('Nancy', 534), ('Paris', 297), ('Caen', 450)]
-# Nice -> [('Marseille', 158), ('Moulins', 750)]
-# Caen -> [('Calais', 450), ('Paris', 241), ('Rennes', 176)]
-# Brest -> [('Rennes', 244)]
-# Toulouse -> [('Limoges', 313), ('Montpellier', 240), ('Bordeaux', 259)]
-# Avignon -> [('Lyon', 216), ('Grenoble', 227), ('Marseille', 99), ('Montpellier', 91)]
-# Grenoble -> [('Avignon', 227), ('Lyon', 104)]
-# Rennes -> [('Caen', 176), ('Paris', 348), ('Nantes', 107), ('Brest', 244)]
-# Nantes -> [('Rennes', 107), ('Limoges', 329), ('Bordeaux', 329)]
-# Montpellier -> [('Avignon', 91), ('Toulouse', 240)]
-# Marseille -> [('Nice', 158), ('Avignon', 99)]
-# Nancy -> [('Strasbourg', 145), ('Dijon', 201), ('Paris', 372), ('Calais', 534)]
-# Strasbourg -> [('Dijon', 335), ('Nancy', 145)]
-# Lyon -> [('Dijon', 192), ('Grenoble', 104), ('Avignon', 216), ('Limoges', 389)]
-# Limoges -> [('Paris', 396), ('Lyon', 389), ('Toulouse', 313), ('Bordeaux', 220), ('Nantes', 329)]
-# Moulins -> [('Nice', 750)]
-# Dijon -> [('Nancy', 201), ('Strasbourg', 335), ('Lyon', 192), ('Paris', 313)]
-# Paris -> [('Calais', 297), ('Nancy', 372), ('Dijon', 313), ('Limoges', 396), ('Rennes', 348), ('Caen', 241)]
-# Bordeaux -> [('Nantes', 329), ('Limoges', 220), ('Toulouse', 259)]
+# Dijon -> (315, 220, [('Nancy', 201), ('Strasbourg', 335), ('Lyon', 192), ('Paris', 313)])
+# Nice -> (810, -790, [('Marseille', 158), ('Moulins', 750)])
+# Grenoble -> (470, -370, [('Avignon', 227), ('Lyon', 104)])
+# Calais -> (-200, 1200, [('Nancy', 534), ('Paris', 297), ('Caen', 450)])
+# Bordeaux -> (-740, -470, [('Nantes', 329), ('Limoges', 220), ('Toulouse', 259)])
+# Limoges -> (-380, -190, [('Paris', 396), ('Lyon', 389), ('Toulouse', 313), ('Bordeaux', 220), ('Nantes', 329)])
+# Toulouse -> (-350, -830, [('Limoges', 313), ('Montpellier', 240), ('Bordeaux', 259)])
+# Montpellier -> (120, -830, [('Avignon', 91), ('Toulouse', 240)])
+# Strasbourg -> (800, 600, [('Dijon', 335), ('Nancy', 145)])
+# Nancy -> (510, 600, [('Strasbourg', 145), ('Dijon', 201), ('Paris', 372), ('Calais', 534)])
+# Paris -> (-190, 640, [('Calais', 297), ('Nancy', 372), ('Dijon', 313), ('Limoges', 396), ('Rennes', 348), ('Caen', 241)])
+# Avignon -> (310, -730, [('Lyon', 216), ('Grenoble', 227), ('Marseille', 99), ('Montpellier', 91)])
+# Lyon -> (290, -215, [('Dijon', 192), ('Grenoble', 104), ('Avignon', 216), ('Limoges', 389)])
+# Caen -> (-600, 730, [('Calais', 450), ('Paris', 241), ('Rennes', 176)])
+# Rennes -> (-910, 480, [('Caen', 176), ('Paris', 348), ('Nantes', 107), ('Brest', 244)])
+# Moulins -> (0, 0, [('Nice', 750)])
+# Nantes -> (-910, 220, [('Rennes', 107), ('Limoges', 329), ('Bordeaux', 329)])
+# Brest -> (-1400, 560, [('Rennes', 244)])
+# Marseille -> (430, -910, [('Nice', 158), ('Avignon', 99)])
 # ------------------------------------------------------------------------------------------------------------------
 
 # Context
@@ -176,56 +158,90 @@ for entry in data:
 # • Teams are composed of 2 students. If you choose to do the project alone or with 2 mates you will get a penalty (unless the last student happens to be alone of course)
 # The excel sheet provided with this document should help you understand precisely what is expected from you in this project.
 
+# Counters of one a_star() call
+class SearchStats:
+    def __init__(self):
+        # Nodes taken out of the open set, nodes added to it (first time or
+        # reopened), decrease-key of a node already in it, and closed nodes
+        # put back in the open set because a shorter path was found later
+        self.expansions = 0
+        self.pushes = 0
+        self.decreases = 0
+        self.reopenings = 0
+
+    def __str__(self):
+        return (f"SearchStats<expansions: {self.expansions}, pushes: {self.pushes}, "
+                f"decreases: {self.decreases}, reopenings: {self.reopenings}>")
+
 # Define the A* algorithm function
-def a_star(graph, start, goal):
-    # Create an empty set to store visited nodes
-    visited = set()
-    
+def a_star(graph, start, goal, stats=None):
     # Create a dictionary to store the distance from start to each node
     distance = {vertex: float('inf') for vertex in graph.vertices}
     distance[start] = 0
     
-    # Create a dictionary to store the estimated distance from start to goal through each node
-    estimated_distance = {vertex: float('inf') for vertex in graph.vertices}
-    estimated_distance[start] = heuristic(start, goal)
-    
     # Create a dictionary to store the previous node in the shortest path
     previous = {vertex: None for vertex in graph.vertices}
     
-    # Create a priority queue to store the nodes to be visited
-    queue = [(estimated_distance[start], start)]
+    # Create the open set: a binary heap of the nodes to be visited, ordered
+    # by estimated distance from start to goal through each node
+    open_set = IndexedHeap()
+    open_set.push(start, heuristic(graph, start, goal))
+    
+    # Create the closed set: nodes whose shortest distance is known. With a
+    # consistent heuristic a closed node is final and its edges are never
+    # looked at again; otherwise a shorter path to it reopens it
+    closed = set()
+    consistent = graph.scale <= graph.consistent_scale
+    expansions, pushes, decreases, reopenings = 0, 1, 0, 0
     
-    while queue:
-        # Get the node with the smallest estimated distance
-        current_distance, current_node = min(queue)
-        queue.remove((current_distance, current_node))
+    while open_set:
+        # Get the node with the smallest estimated distance, in O(log V)
+        _, current_node = open_set.pop()
+        expansions += 1
         
         # Check if the current node is the goal
         if current_node == goal:
             break
         
-        # Add the current node to the visited set
-        visited.add(current_node)
+        # Add the current node to the closed set
+        closed.add(current_node)
         
         # Explore the neighbors of the current node
         for neighbor, edge_distance in graph.get_neighbors(current_node):
+            if consistent and neighbor in closed:
+                continue
+            
             # Calculate the tentative distance from start to the neighbor
             tentative_distance = distance[current_node] + edge_distance
             
             # Check if the tentative distance is smaller than the current distance
             if tentative_distance < distance[neighbor]:
-                # Update the distance and estimated distance
-                distance[neighbor] = tentative_distance
-                estimated_distance[neighbor] = tentative_distance + heuristic(neighbor, goal)
+                if distance[neighbor] == float('inf'):
+                    pushes += 1
+                elif neighbor in closed:
+                    # Only with an inconsistent heuristic
+                    closed.remove(neighbor)
+                    pushes += 1
+                    reopenings += 1
+                else:
+                    decreases += 1
                 
-                # Update the previous node
+                # Update the distance and the previous node
+                distance[neighbor] = tentative_distance
                 previous[neighbor] = current_node
                 
-                # Add the neighbor to the queue
-                queue.append((estimated_distance[neighbor], neighbor))
+                # Add the neighbor to the open set, or lower its estimated
+                # distance if it is already there (decrease-key)
+                open_set.push(neighbor, tentative_distance + heuristic(graph, neighbor, goal))
+    
+    if stats is not None:
+        stats.expansions = expansions
+        stats.pushes = pushes
+        stats.decreases = decreases
+        stats.reopenings = reopenings
     
     # Check if a path was found
-    if previous[goal] is None:
+    if distance[goal] == float('inf'):
         return None
     
     # Reconstruct the shortest path
@@ -238,46 +254,360 @@ def a_star(graph, start, goal):
     
     return path
 
-# Define the heuristic function (Euclidean distance)
-def heuristic(node1, node2):
+# Define the heuristic function (Euclidean distance, scaled down so that it
+# never overestimates the road distance)
+def heuristic(graph, node1, node2):
     x1, y1 = graph.get_coordinates(node1)
     x2, y2 = graph.get_coordinates(node2)
-    # print(node1)
-    # print(x1, y1, x2, y2)  # ('Caen', 176) ('Paris', 348) ('Dijon', 192) ('Grenoble', 104)
-    return ((x1[1] - x2[1]) ** 2 + (y1[1] - y2[1]) ** 2) ** 0.5
-
-# Check if the city names are provided as command line arguments
-if len(sys.argv) == 3:
-    start_city = sys.argv[1]
-    goal_city = sys.argv[2]
-else:
-    # Ask for the city names
-    start_city = input("Enter the name of the start city: ")
-    goal_city = input("Enter the name of the goal city: ")
-
-# Check if the start and goal cities are valid
-if start_city not in graph.vertices or goal_city not in graph.vertices:
-    print("Error: Unknown city name")
-    sys.exit(1)
-
-# Run the A* algorithm
-path = a_star(graph, start_city, goal_city)
-
-# Check if a path was found
-if path is None:
-    print("No path found")
-    sys.exit(3)
-
-# Print the shortest path
-total_distance = 0
-for i in range(len(path)):
-    city = path[i]
-    distance = graph.get_edge_distance(path[i-1], city) if i > 0 else 0
-    total_distance += distance
-    print(f"{city} : ({total_distance} km)")
-
-# Print the total distance
-print(f"Total distance: {total_distance} km")
-
-# Return success
-sys.exit(0)
+    return graph.scale * ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
+
+# A* for many queries on the same graph, on the compiled graph (dense ids,
+# CSR arrays, see csr_graph). The per-node data lives in lists allocated
+# once. A value of these lists only counts if its stamp equals the
+# generation of the current query, so a new query starts by incrementing
+# the generation instead of resetting O(V) entries, and costs only in
+# proportion to the nodes it explores.
+# The heuristic is one of heuristics.HEURISTICS, scaled so that it stays
+# consistent (for euclidean, the scale of the graph is used as it is), or the
+# ALT bound of the given landmarks (see landmarks.py), which needs no scale.
+# The engine is a snapshot: build a new one after changing the graph.
+class AStarEngine:
+    def __init__(self, graph, heuristic='euclidean', landmarks=None):
+        self.graph = graph.compile()
+        self.names = self.graph.names
+        self.heuristic = heuristic
+        self.distance_function = heuristics.distance_function(heuristic)
+        self.landmarks = landmarks
+        if landmarks is not None:
+            # The landmark tables are indexed by the ids of their own graph,
+            # which must be this map (the same check as Landmarks.load)
+            other = landmarks.graph
+            if other is not self.graph and (other.vertex_count, other.edge_count, fingerprint(other)) != (
+                    self.graph.vertex_count, self.graph.edge_count, fingerprint(self.graph)):
+                raise ValueError("The landmarks were computed for another map")
+            self.heuristic = 'landmarks'
+            self.scale = self.consistent_scale = 1
+        elif heuristic == 'euclidean':
+            self.scale = self.graph.scale
+            self.consistent_scale = self.graph.consistent_scale
+        else:
+            self.scale = self.consistent_scale = heuristics.scale(self.graph, heuristic)
+        
+        size = self.graph.vertex_count
+        self.distance = [0] * size
+        self.previous = [0] * size
+        # Generation in which distance and previous were set, and generation
+        # in which the node was closed
+        self.stamp = [0] * size
+        self.closed = [0] * size
+        self.generation = 0
+        self.open_set = DenseIndexedHeap(size)
+        # Same data for the backward half of bidirectional_search, which
+        # follows the roads reversed (made on its first call)
+        self.reverse = None
+        self.backward_distance = [0] * size
+        self.next = [0] * size
+        self.backward_stamp = [0] * size
+        self.backward_closed = [0] * size
+        self.backward_open_set = DenseIndexedHeap(size)
+
+    def __str__(self):
+        return f"AStarEngine<{len(self.names)}, {self.generation}>"
+
+    def position(self, node):
+        # Coordinates of a dense id, with the error of graph.get_coordinates
+        if not self.graph.has_coordinates(node):
+            raise ValueError(f"Node {self.names[node]} not found in graph or does not have valid coordinates")
+        return self.graph.xs[node], self.graph.ys[node]
+
+    def search(self, start, goal, stats=None, precompute=False):
+        # Same search and result as a_star(graph, start, goal, stats).
+        # With precompute, the heuristic of every city is computed first in
+        # one pass (O(V), worth it for the long queries only)
+        graph = self.graph
+        start = graph.id(start)
+        goal = graph.id(goal)
+        if start is None or goal is None:
+            return None
+        
+        self.generation += 1
+        generation = self.generation
+        distance = self.distance
+        previous = self.previous
+        stamp = self.stamp
+        closed = self.closed
+        offsets = graph.offsets
+        targets = graph.targets
+        weights = graph.weights
+        open_set = self.open_set
+        scale = self.scale
+        consistent = scale <= self.consistent_scale
+        distance_function = self.distance_function
+        estimator = None
+        estimates = None
+        if self.landmarks is not None:
+            estimator = self.landmarks.estimator(goal)
+            if precompute:
+                estimates = [estimator(vertex) for vertex in range(graph.vertex_count)]
+            first_estimate = estimator(start)
+        else:
+            # The coordinates of the goal are looked up once per query
+            goal_x, goal_y = self.position(goal)
+            if precompute:
+                estimates = heuristics.estimates(graph, self.heuristic, goal_x, goal_y, scale)
+            x, y = self.position(start)
+            first_estimate = scale * distance_function(x, y, goal_x, goal_y)
+        
+        distance[start] = 0
+        previous[start] = -1
+        stamp[start] = generation
+        open_set.push(start, first_estimate)
+        expansions, pushes, decreases, reopenings = 0, 1, 0, 0
+        found = False
+        
+        try:
+            while open_set:
+                _, current_node = open_set.pop()
+                expansions += 1
+                if current_node == goal:
+                    found = True
+                    break
+                closed[current_node] = generation
+                current_distance = distance[current_node]
+            
+                first, last = offsets[current_node], offsets[current_node + 1]
+                for neighbor, edge_distance in zip(targets[first:last], weights[first:last]):
+                    if consistent and closed[neighbor] == generation:
+                        continue
+                    tentative_distance = current_distance + edge_distance
+                    if stamp[neighbor] != generation:
+                        # First time this query sees the neighbor
+                        stamp[neighbor] = generation
+                        pushes += 1
+                    elif tentative_distance >= distance[neighbor]:
+                        continue
+                    elif closed[neighbor] == generation:
+                        closed[neighbor] = 0
+                        pushes += 1
+                        reopenings += 1
+                    else:
+                        decreases += 1
+                    distance[neighbor] = tentative_distance
+                    previous[neighbor] = current_node
+                    if estimates is not None:
+                        estimate = estimates[neighbor]
+                        if estimate != estimate:
+                            # nan: no coordinates, raises the error
+                            self.position(neighbor)
+                    elif estimator is not None:
+                        estimate = estimator(neighbor)
+                    else:
+                        x, y = self.position(neighbor)
+                        estimate = scale * distance_function(x, y, goal_x, goal_y)
+                    open_set.push(neighbor, tentative_distance + estimate)
+        finally:
+            # Only the nodes left in the open set have to be cleaned up, even
+            # when the search is interrupted
+            open_set.clear()
+        if stats is not None:
+            stats.expansions = expansions
+            stats.pushes = pushes
+            stats.decreases = decreases
+            stats.reopenings = reopenings
+        
+        if not found:
+            return None
+        path = []
+        current_node = goal
+        while current_node != -1:
+            path.append(self.names[current_node])
+            current_node = previous[current_node]
+        path.reverse()
+        return path
+
+    def potential(self, start, goal):
+        # Function city id -> (estimate to goal - estimate from start) / 2,
+        # 0 everywhere when the heuristic is not consistent
+        if self.landmarks is not None:
+            to_goal = self.landmarks.estimator(goal)
+            from_start = self.landmarks.estimator(start, reverse=True)
+        elif self.scale <= self.consistent_scale:
+            scale = self.scale
+            distance_function = self.distance_function
+            goal_x, goal_y = self.position(goal)
+            start_x, start_y = self.position(start)
+
+            def to_goal(vertex):
+                x, y = self.position(vertex)
+                return scale * distance_function(x, y, goal_x, goal_y)
+
+            def from_start(vertex):
+                x, y = self.position(vertex)
+                return scale * distance_function(start_x, start_y, x, y)
+        else:
+            return lambda vertex: 0
+        return lambda vertex: (to_goal(vertex) - from_start(vertex)) / 2
+
+    def bidirectional_search(self, start, goal, stats=None):
+        # Same result as search(start, goal) (a path of the same length),
+        # searching forward from start and backward from goal, over the
+        # reversed roads, at the same time. The forward key of a city is
+        # its distance plus potential(city), the backward key its distance
+        # minus potential(city): this average of the two heuristics keeps
+        # both halves consistent, so a closed city is final on both sides,
+        # and no path through the cities still open can be shorter than the
+        # best one found once the two smallest keys add up to its length.
+        graph = self.graph
+        start = graph.id(start)
+        goal = graph.id(goal)
+        if start is None or goal is None:
+            return None
+        if self.reverse is None:
+            self.reverse = graph if graph.is_symmetric() else graph.reversed()
+        potential = self.potential(start, goal)
+        
+        self.generation += 1
+        generation = self.generation
+        # Forward side, backward side: (stamp, distance, previous or next,
+        # closed, open set, roads, sign of the potential)
+        sides = ((self.stamp, self.distance, self.previous, self.closed, self.open_set, graph, 1),
+                 (self.backward_stamp, self.backward_distance, self.next, self.backward_closed,
+                  self.backward_open_set, self.reverse, -1))
+        best = 0 if start == goal else float('inf')
+        meeting = start if start == goal else -1
+        expansions, pushes, decreases = 0, 2, 0
+        
+        try:
+            for side, vertex in ((0, start), (1, goal)):
+                stamp, distance, previous, _, open_set, _, sign = sides[side]
+                stamp[vertex] = generation
+                distance[vertex] = 0
+                previous[vertex] = -1
+                open_set.push(vertex, sign * potential(vertex))
+            while self.open_set and self.backward_open_set:
+                forward_key = self.open_set.peek()[0]
+                backward_key = self.backward_open_set.peek()[0]
+                if forward_key + backward_key >= best:
+                    break
+                # Expand the side with the smallest key
+                side = 0 if forward_key <= backward_key else 1
+                stamp, distance, previous, closed, open_set, roads, sign = sides[side]
+                other_stamp, other_distance = sides[1 - side][0], sides[1 - side][1]
+                _, current_node = open_set.pop()
+                expansions += 1
+                closed[current_node] = generation
+                current_distance = distance[current_node]
+            
+                first, last = roads.offsets[current_node], roads.offsets[current_node + 1]
+                for neighbor, edge_distance in zip(roads.targets[first:last], roads.weights[first:last]):
+                    if closed[neighbor] == generation:
+                        continue
+                    tentative_distance = current_distance + edge_distance
+                    if stamp[neighbor] != generation:
+                        stamp[neighbor] = generation
+                        pushes += 1
+                    elif tentative_distance >= distance[neighbor]:
+                        continue
+                    else:
+                        decreases += 1
+                    distance[neighbor] = tentative_distance
+                    previous[neighbor] = current_node
+                    open_set.push(neighbor, tentative_distance + sign * potential(neighbor))
+                    # A path start -> neighbor -> goal through the other side
+                    if other_stamp[neighbor] == generation and tentative_distance + other_distance[neighbor] < best:
+                        best = tentative_distance + other_distance[neighbor]
+                        meeting = neighbor
+        finally:
+            self.open_set.clear()
+            self.backward_open_set.clear()
+        if stats is not None:
+            stats.expansions = expansions
+            stats.pushes = pushes
+            stats.decreases = decreases
+            stats.reopenings = 0
+        
+        if meeting == -1:
+            return None
+        path = []
+        current_node = meeting
+        while current_node != -1:
+            path.append(self.names[current_node])
+            current_node = self.previous[current_node]
+        path.reverse()
+        current_node = self.next[meeting]
+        while current_node != -1:
+            path.append(self.names[current_node])
+            current_node = self.next[current_node]
+        return path
+
+# Print a path with the distance from the start at every city
+def print_path(graph, path):
+    total_distance = 0
+    for i in range(len(path)):
+        city = path[i]
+        distance = graph.get_edge_distance(path[i-1], city) if i > 0 else 0
+        total_distance += distance
+        print(f"{city} : ({total_distance} km)")
+
+    # Print the total distance
+    print(f"Total distance: {total_distance} km")
+
+def main():
+    # Usage: python astar.py [--map map file] [start city goal city]
+    # Without a map file, the FRANCE.MAP copy above is used
+    arguments = sys.argv[1:]
+    map_path = None
+    if len(arguments) >= 2 and arguments[0] == "--map":
+        map_path = arguments[1]
+        arguments = arguments[2:]
+
+    # Make the compiled graph of the map (read from its cache file after the
+    # first run)
+    if map_path is None:
+        graph = map_file.compile_map(data.split('\n'))
+    else:
+        try:
+            graph = map_file.load_map(map_path)
+        except OSError:
+            print(f"Error: Cannot read the map file {map_path}")
+            sys.exit(2)
+        except map_file.MapFormatError as error:
+            print(f"Error: {map_path}: {error}")
+            sys.exit(2)
+
+    # Check if the city names are provided as command line arguments
+    if len(arguments) == 2:
+        start_city = arguments[0]
+        goal_city = arguments[1]
+    else:
+        # Ask for the city names
+        start_city = input("Enter the name of the start city: ")
+        goal_city = input("Enter the name of the goal city: ")
+
+    # Check if the start and goal cities are valid
+    if graph.id(start_city) is None or graph.id(goal_city) is None:
+        print("Error: Unknown city name")
+        sys.exit(1)
+
+    # Cities in different components have no path between them: no need to
+    # search (O(alpha(V)) once the index is made)
+    if not graph.connected(start_city, goal_city):
+        print("No path found")
+        sys.exit(3)
+
+    # Run the A* algorithm
+    path = AStarEngine(graph).search(start_city, goal_city)
+
+    # Check if a path was found
+    if path is None:
+        print("No path found")
+        sys.exit(3)
+
+    # Print the shortest path
+    print_path(graph, path)
+
+    # Return success
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
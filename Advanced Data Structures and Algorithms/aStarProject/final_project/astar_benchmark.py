@@ -0,0 +1,395 @@
+# ---------- A* benchmarks ----------
+# Description: A* on synthetic road graphs (a jittered grid of cities, each
+# connected to its right and lower neighbors and sometimes to a diagonal
+# one), from one corner to the opposite one so that most of the graph is
+# explored. With a binary heap as open set the time per (V + E) log V should
+# stay flat when the graph grows; the min() + remove() open set of the first
+# version is given for the small graphs, its time grows like V^2.
+# Usage: python astar_benchmark.py scaling [largest number of cities] [queries]
+#        python astar_benchmark.py short [cities] [queries]
+#        python astar_benchmark.py heuristics [cities] [queries]
+#        python astar_benchmark.py landmarks [cities] [queries]
+#        python astar_benchmark.py contraction [largest number of cities] [queries]
+#        python astar_benchmark.py bidirectional [cities] [queries]
+#        python astar_benchmark.py matrix [cities] [sources and targets]
+#        python astar_benchmark.py mapfile [cities]
+#        python astar_benchmark.py cache [cities] [queries]
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import heuristics as hs
+import map_file
+import weighted_graph as wg
+from astar import AStarEngine, SearchStats, a_star, heuristic
+from contraction import ContractionHierarchy
+from distance_matrix import distance_matrix
+from landmarks import Landmarks
+from path_cache import PathCache
+
+
+def road_graph(n, seed=0):
+    # About n cities named c0, c1, ... on a side x side grid, 100 km apart;
+    # roads are 1 to 1.5 times longer than the straight line
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    coordinates = [(100 * (i % side) + rng.randint(-30, 30), 100 * (i // side) + rng.randint(-30, 30))
+                   for i in range(side * side)]
+    edges = [[] for _ in range(side * side)]
+
+    def road(a, b):
+        (x1, y1), (x2, y2) = coordinates[a], coordinates[b]
+        distance = math.ceil(math.hypot(x1 - x2, y1 - y2) * rng.uniform(1, 1.5))
+        edges[a].append((f"c{b}", distance))
+        edges[b].append((f"c{a}", distance))
+
+    for i in range(side * side):
+        row, column = divmod(i, side)
+        if column + 1 < side:
+            road(i, i + 1)
+        if row + 1 < side:
+            road(i, i + side)
+            if column + 1 < side and rng.random() < 0.2:
+                road(i, i + side + 1)
+
+    cities = [(f"c{i}", x, y, edges[i]) for i, (x, y) in enumerate(coordinates)]
+    return wg.WeightedGraph.from_cities(cities)
+
+
+def list_a_star(graph, start, goal):
+    # The first version of a_star: the open set is a plain list, and the
+    # next node is found with min() and removed with remove()
+    distance = {vertex: float('inf') for vertex in graph.vertices}
+    distance[start] = 0
+    previous = {vertex: None for vertex in graph.vertices}
+    queue = [(heuristic(graph, start, goal), start)]
+    while queue:
+        current = min(queue)
+        queue.remove(current)
+        current_node = current[1]
+        if current_node == goal:
+            break
+        for neighbor, edge_distance in graph.get_neighbors(current_node):
+            tentative_distance = distance[current_node] + edge_distance
+            if tentative_distance < distance[neighbor]:
+                distance[neighbor] = tentative_distance
+                previous[neighbor] = current_node
+                queue.append((tentative_distance + heuristic(graph, neighbor, goal), neighbor))
+    if distance[goal] == float('inf'):
+        return None
+    path = []
+    current_node = goal
+    while current_node is not None:
+        path.append(current_node)
+        current_node = previous[current_node]
+    path.reverse()
+    return path
+
+
+def scaling(largest=200_000, queries=3):
+    # The counters are those of the heap version, summed over the queries
+    print(f"{'open set':>9} {'V':>8} {'E':>8} {'time (s)':>9} {'ns / ((V + E) log V)':>21} "
+          f"{'expansions':>11} {'pushes':>8} {'reopenings':>11}")
+    n = 1000
+    while n <= largest:
+        graph = road_graph(n)
+        vertices = graph.vertices
+        v = len(vertices)
+        e = sum(len(graph.get_neighbors(vertex)) for vertex in vertices)
+        # Corner to corner, and the other diagonal
+        side = math.isqrt(v)
+        pairs = [("c0", f"c{v - 1}"), (f"c{side - 1}", f"c{v - side}")][:queries]
+        pairs += [(f"c{random.randrange(v)}", f"c{random.randrange(v)}") for _ in range(queries - len(pairs))]
+
+        for name, search in (("heap", a_star), ("list", list_a_star)):
+            if name == "list" and v > 20_000:
+                continue
+            counters = [0, 0, 0]
+            start = time.monotonic()
+            for first, last in pairs:
+                if name == "heap":
+                    stats = SearchStats()
+                    search(graph, first, last, stats)
+                    counters[0] += stats.expansions
+                    counters[1] += stats.pushes
+                    counters[2] += stats.reopenings
+                else:
+                    search(graph, first, last)
+            elapsed = (time.monotonic() - start) / len(pairs)
+            if name == "list":
+                counters = ["-", "-", "-"]
+            print(f"{name:>9} {v:>8} {e:>8} {elapsed:>9.3f} {elapsed * 1e9 / ((v + e) * math.log2(v)):>21.1f} "
+                  f"{counters[0]:>11} {counters[1]:>8} {counters[2]:>11}")
+        n *= 4 if n < 64_000 else 2
+
+
+def short(n=250_000, queries=200):
+    # Queries between cities a few roads apart on a large map: a_star()
+    # pays O(V) to set up each query, AStarEngine only for what it explores
+    graph = road_graph(n)
+    v = len(graph.vertices)
+    side = math.isqrt(v)
+    rng = random.Random(1)
+    pairs = []
+    for _ in range(queries):
+        first = rng.randrange(v - 5 * side - 5)
+        pairs.append((f"c{first}", f"c{first + rng.randrange(5) * side + rng.randrange(5)}"))
+
+    print(f"{'search':>12} {'V':>8} {'queries':>8} {'setup (s)':>10} {'ms / query':>11} {'expansions':>11}")
+    start = time.monotonic()
+    engine = AStarEngine(graph)
+    setup = time.monotonic() - start
+    for name, search, setup_time in (("a_star", lambda first, last, stats: a_star(graph, first, last, stats), 0),
+                                     ("AStarEngine", engine.search, setup)):
+        expansions = 0
+        start = time.monotonic()
+        for first, last in pairs:
+            stats = SearchStats()
+            search(first, last, stats)
+            expansions += stats.expansions
+        elapsed = time.monotonic() - start
+        print(f"{name:>12} {v:>8} {queries:>8} {setup_time:>10.2f} {elapsed * 1000 / queries:>11.3f} {expansions:>11}")
+
+
+def heuristics(n=60_000, queries=20):
+    # Every heuristic, computed per relaxation or precomputed for all the
+    # cities at the start of each query (NumPy is used if installed)
+    graph = road_graph(n)
+    v = len(graph.vertices)
+    rng = random.Random(2)
+    pairs = [(f"c{rng.randrange(v)}", f"c{rng.randrange(v)}") for _ in range(queries)]
+
+    print(f"numpy: {hs.numpy is not None}")
+    print(f"{'heuristic':>13} {'precompute':>11} {'scale':>7} {'ms / query':>11} {'expansions':>11}")
+    for heuristic in hs.HEURISTICS:
+        engine = AStarEngine(graph, heuristic)
+        for precompute in (False, True):
+            expansions = 0
+            start = time.monotonic()
+            for first, last in pairs:
+                stats = SearchStats()
+                engine.search(first, last, stats, precompute)
+                expansions += stats.expansions
+            elapsed = time.monotonic() - start
+            print(f"{heuristic:>13} {str(precompute):>11} {engine.scale:>7.3f} "
+                  f"{elapsed * 1000 / queries:>11.1f} {expansions:>11}")
+
+
+def landmarks(n=60_000, queries=50):
+    # Expansions of the ALT heuristic for several numbers of landmarks,
+    # against the straight line; the preprocessing is timed, and so is the
+    # loading of its file, which is all a later run of the same map pays
+    graph = road_graph(n)
+    v = len(graph.vertices)
+    rng = random.Random(3)
+    pairs = [(f"c{rng.randrange(v)}", f"c{rng.randrange(v)}") for _ in range(queries)]
+    path = os.path.join(tempfile.gettempdir(), "astar_benchmark.landmarks")
+
+    print(f"{'heuristic':>12} {'preprocess (s)':>15} {'load (s)':>9} {'ms / query':>11} {'expansions':>11}")
+    for k in (0, 4, 8, 16):
+        preprocess = load = 0
+        if k == 0:
+            engine = AStarEngine(graph)
+        else:
+            start = time.monotonic()
+            Landmarks.select(graph, k).save(path)
+            preprocess = time.monotonic() - start
+            start = time.monotonic()
+            found = Landmarks.load(path, graph)
+            load = time.monotonic() - start
+            engine = AStarEngine(found.graph, landmarks=found)
+
+        expansions = 0
+        start = time.monotonic()
+        for first, last in pairs:
+            stats = SearchStats()
+            engine.search(first, last, stats)
+            expansions += stats.expansions
+        elapsed = time.monotonic() - start
+        name = "euclidean" if k == 0 else f"ALT k={k}"
+        print(f"{name:>12} {preprocess:>15.2f} {load:>9.3f} {elapsed * 1000 / queries:>11.1f} {expansions:>11}")
+    os.remove(path)
+
+
+def contraction(largest=4000, queries=100):
+    # Contraction hierarchies against A*: preprocessing time and size, and
+    # the latency of random queries (the paths must have the same length)
+    print(f"{'V':>7} {'E':>8} {'shortcuts':>10} {'preprocess (s)':>15} {'A* ms / query':>14} {'CH ms / query':>14}")
+    n = 1000
+    while n <= largest:
+        graph = road_graph(n)
+        v = len(graph.vertices)
+        rng = random.Random(4)
+        pairs = [(f"c{rng.randrange(v)}", f"c{rng.randrange(v)}") for _ in range(queries)]
+
+        start = time.monotonic()
+        hierarchy = ContractionHierarchy(graph)
+        preprocess = time.monotonic() - start
+        engine = AStarEngine(graph)
+
+        lengths = []
+        latencies = []
+        for search in (engine.search, hierarchy.search):
+            start = time.monotonic()
+            paths = [search(first, last) for first, last in pairs]
+            latencies.append((time.monotonic() - start) * 1000 / queries)
+            lengths.append([sum(graph.get_edge_distance(a, b) for a, b in zip(path, path[1:])) for path in paths])
+        if lengths[0] != lengths[1]:
+            print("Different path lengths")
+        print(f"{v:>7} {hierarchy.graph.edge_count:>8} {hierarchy.shortcuts:>10} {preprocess:>15.2f} "
+              f"{latencies[0]:>14.2f} {latencies[1]:>14.2f}")
+        n *= 2
+
+
+def bidirectional(n=60_000, queries=50):
+    # Forward search against bidirectional search, with no heuristic
+    # (Dijkstra: the scale set to 0), the straight line and ALT landmarks
+    graph = road_graph(n)
+    v = len(graph.vertices)
+    rng = random.Random(5)
+    pairs = [(f"c{rng.randrange(v)}", f"c{rng.randrange(v)}") for _ in range(queries)]
+
+    print(f"{'heuristic':>10} {'forward ms':>11} {'expansions':>11} {'bidirectional ms':>17} {'expansions':>11}")
+    for name in ("none", "euclidean", "landmarks"):
+        if name == "landmarks":
+            found = Landmarks.select(graph, 8)
+            engine = AStarEngine(found.graph, landmarks=found)
+        else:
+            engine = AStarEngine(graph)
+            if name == "none":
+                engine.scale = 0
+        results = []
+        for search in (engine.search, engine.bidirectional_search):
+            expansions = 0
+            start = time.monotonic()
+            for first, last in pairs:
+                stats = SearchStats()
+                search(first, last, stats)
+                expansions += stats.expansions
+            results.append(((time.monotonic() - start) * 1000 / queries, expansions))
+        print(f"{name:>10} {results[0][0]:>11.1f} {results[0][1]:>11} {results[1][0]:>17.1f} {results[1][1]:>11}")
+
+
+def matrix(n=20_000, size=20):
+    # size x size distance matrix: one A* per pair against one Dijkstra per
+    # source, on 1, 2 and 4 processes
+    graph = road_graph(n)
+    v = len(graph.vertices)
+    rng = random.Random(6)
+    sources = [f"c{rng.randrange(v)}" for _ in range(size)]
+    targets = [f"c{rng.randrange(v)}" for _ in range(size)]
+
+    engine = AStarEngine(graph)
+    start = time.monotonic()
+    expected = []
+    for source in sources:
+        paths = [engine.search(source, target) for target in targets]
+        expected.append([sum(graph.get_edge_distance(a, b) for a, b in zip(path, path[1:])) for path in paths])
+    print(f"{'A* per pair':>22}: {time.monotonic() - start:.2f} s")
+    for processes in (1, 2, 4):
+        start = time.monotonic()
+        result = distance_matrix(graph, sources, targets, processes)
+        elapsed = time.monotonic() - start
+        if result != expected:
+            print("Different distances")
+        print(f"{f'Dijkstra, {processes} processes':>22}: {elapsed:.2f} s")
+
+
+def mapfile(n=300_000):
+    # A synthetic map written in the FRANCE.MAP format, loaded as a string
+    # (WeightedGraph.from_map), streamed (map_file.compile_map) and from its
+    # binary cache: time and peak of the memory allocated by Python
+    graph = road_graph(n)
+    path = os.path.join(tempfile.gettempdir(), "astar_benchmark.map")
+    lines = 0
+    with open(path, 'w') as file:
+        for city in graph.vertices:
+            x, y, edges = graph.ht.get(city)
+            file.write(f"{city} {x} {y}\n")
+            for neighbor, distance in edges:
+                file.write(f"{neighbor} {distance}\n")
+            file.write("\n")
+            lines += len(edges) + 2
+
+    def whole_file():
+        with open(path) as file:
+            return wg.WeightedGraph.from_map(file.read()).compile()
+
+    def streamed():
+        with open(path) as file:
+            return map_file.compile_map(file)
+
+    def cached():
+        return map_file.load_map(path)
+
+    print(f"{lines} lines, {os.path.getsize(path) // 1024} KiB")
+    map_file.load_map(path)  # makes the cache
+    print(f"{'load':>16} {'time (s)':>9} {'peak (MiB)':>11}")
+    for name, load in (("whole file", whole_file), ("streamed", streamed), ("binary cache", cached)):
+        start = time.monotonic()
+        load()
+        elapsed = time.monotonic() - start
+        tracemalloc.start()
+        load()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>16} {elapsed:>9.2f} {peak / 2 ** 20:>11.1f}")
+    os.remove(path)
+    os.remove(map_file.cache_path(path))
+
+
+def cache(n=60_000, queries=200):
+    # Skewed traffic: 80% of the queries start from 4 cities. A* for every
+    # query against the shortest path trees of the start cities, kept by a
+    # PathCache of 8 trees
+    graph = road_graph(n)
+    v = len(graph.vertices)
+    rng = random.Random(7)
+    popular = [f"c{rng.randrange(v)}" for _ in range(4)]
+    pairs = [(rng.choice(popular) if rng.random() < 0.8 else f"c{rng.randrange(v)}", f"c{rng.randrange(v)}")
+             for _ in range(queries)]
+
+    engine = AStarEngine(graph)
+    trees = PathCache(graph, capacity=8)
+    lengths = []
+    for search in (engine.search, trees.search):
+        start = time.monotonic()
+        paths = [search(first, last) for first, last in pairs]
+        elapsed = time.monotonic() - start
+        lengths.append([sum(graph.get_edge_distance(a, b) for a, b in zip(path, path[1:])) for path in paths])
+        print(f"{'A*' if search == engine.search else 'PathCache':>10}: {elapsed * 1000 / queries:.1f} ms / query")
+    if lengths[0] != lengths[1]:
+        print("Different path lengths")
+    print(trees, f"evictions: {trees.evictions}")
+
+
+if __name__ == "__main__":
+    benchmark = sys.argv[1] if len(sys.argv) > 1 else "scaling"
+    args = [int(arg) for arg in sys.argv[2:]]
+
+    if benchmark == "scaling":
+        scaling(*args)
+    elif benchmark == "short":
+        short(*args)
+    elif benchmark == "heuristics":
+        heuristics(*args)
+    elif benchmark == "landmarks":
+        landmarks(*args)
+    elif benchmark == "contraction":
+        contraction(*args)
+    elif benchmark == "bidirectional":
+        bidirectional(*args)
+    elif benchmark == "matrix":
+        matrix(*args)
+    elif benchmark == "mapfile":
+        mapfile(*args)
+    elif benchmark == "cache":
+        cache(*args)
+    else:
+        print(f"Unknown benchmark: {benchmark}")
+        sys.exit(1)
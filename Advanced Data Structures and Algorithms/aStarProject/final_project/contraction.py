@@ -0,0 +1,328 @@
+# ---------- Contraction Hierarchies ----------
+# Description: Preprocessing for very fast shortest path queries on large
+# road maps. The cities are contracted one by one, least important first:
+# removing a city v adds a shortcut u -> w (of length u -> v -> w) for every
+# pair of remaining neighbors whose shortest path goes through v. The order of
+# contraction is the rank of a city. A query then runs Dijkstra forward from
+# the start and backward from the goal, both only going up in rank, and the
+# shortest path is found where the two searches meet. Shortcuts remember the
+# city they skip, so the path is unpacked into the real roads at the end.
+
+# structure: rank:                         list city id -> contraction order
+#            up_offsets / up_targets /     CSR of the roads and shortcuts
+#            up_weights / up_middles:      u -> w with rank[u] < rank[w]
+#            down_offsets / down_sources / CSR of the roads and shortcuts
+#            down_weights / down_middles:  u -> w with rank[u] > rank[w],
+#                                          stored with w
+#            middle: the city a shortcut skips, -1 for a real road
+#
+# Node order: a city is contracted when its priority, twice the number of
+# shortcuts it needs minus the number of its roads (edge difference), plus
+# the number of its neighbors already contracted, is the smallest (checked
+# again just before, "lazy updates"). Witness searches (is there a path
+# u -> w avoiding v that is not longer?) are bounded, so a few unnecessary
+# shortcuts may be added; they never make a query wrong.
+
+from array import array
+
+from indexed_heap import DenseIndexedHeap
+
+# Largest number of cities a witness search settles
+WITNESS_LIMIT = 500
+
+
+class ContractionHierarchy:
+    def __init__(self, graph):
+        self.graph = graph.compile()
+        size = self.graph.vertex_count
+        self.names = self.graph.names
+        # Search state reused by every witness search and every query
+        self.generation = 0
+        self.stamp = [0] * size
+        self.distance = [0] * size
+        self.backward_stamp = [0] * size
+        self.target_stamp = [0] * size
+        self.backward_distance = [0] * size
+        self.parent = [0] * size
+        self.backward_parent = [0] * size
+        self.heap = DenseIndexedHeap(size)
+        self.backward_heap = DenseIndexedHeap(size)
+        self.contract()
+
+    def __str__(self):
+        return f"ContractionHierarchy<{self.graph.vertex_count}, {len(self.up_targets) + len(self.down_sources)}>"
+
+    # ---------- preprocessing ----------
+
+    def contract(self):
+        graph = self.graph
+        size = graph.vertex_count
+        # [neighbor, distance, middle] of the roads and shortcuts of every city
+        self.out_edges = [[] for _ in range(size)]
+        self.in_edges = [[] for _ in range(size)]
+        for vertex in range(size):
+            for neighbor, distance in graph.neighbors(vertex):
+                if neighbor != vertex:
+                    self.add_edge(vertex, neighbor, distance, -1)
+
+        self.contracted = bytearray(size)
+        self.contracted_neighbors = [0] * size
+        self.rank = [0] * size
+        self.shortcuts = 0
+        queue = DenseIndexedHeap(size)
+        for vertex in range(size):
+            queue.push(vertex, self.priority(vertex))
+
+        order = 0
+        while queue:
+            _, vertex = queue.pop()
+            # Lazy update: the priority may have grown since it was pushed
+            priority = self.priority(vertex)
+            if queue and priority > queue.peek()[0]:
+                queue.push(vertex, priority)
+                continue
+            for u, w, distance in self.needed_shortcuts(vertex):
+                self.add_edge(u, w, distance, vertex)
+                self.shortcuts += 1
+            self.contracted[vertex] = 1
+            self.rank[vertex] = order
+            order += 1
+            for neighbor, _, _ in self.out_edges[vertex] + self.in_edges[vertex]:
+                self.contracted_neighbors[neighbor] += 1
+
+        self.build_search_graph()
+        del self.out_edges, self.in_edges, self.contracted, self.contracted_neighbors
+
+    def add_edge(self, u, w, distance, middle):
+        # Road or shortcut u -> w, keeping only the shortest one per pair
+        for edge in self.out_edges[u]:
+            if edge[0] == w:
+                if distance < edge[1]:
+                    edge[1] = distance
+                    edge[2] = middle
+                    for back in self.in_edges[w]:
+                        if back[0] == u:
+                            back[1] = distance
+                            back[2] = middle
+                return
+        self.out_edges[u].append([w, distance, middle])
+        self.in_edges[w].append([u, distance, middle])
+
+    def needed_shortcuts(self, vertex):
+        # (u, w, distance) for every pair of remaining neighbors u -> vertex
+        # -> w without a witness path of at most the same length
+        contracted = self.contracted
+        incoming = [(u, distance) for u, distance, _ in self.in_edges[vertex] if not contracted[u]]
+        outgoing = [(w, distance) for w, distance, _ in self.out_edges[vertex] if not contracted[w]]
+        shortcuts = []
+        for u, to_vertex in incoming:
+            targets = [(w, to_vertex + from_vertex) for w, from_vertex in outgoing if w != u]
+            if not targets:
+                continue
+            self.witness_search(u, vertex, targets)
+            for w, distance in targets:
+                if self.stamp[w] != self.generation or self.distance[w] > distance:
+                    shortcuts.append((u, w, distance))
+        return shortcuts
+
+    def priority(self, vertex):
+        contracted = self.contracted
+        edges = (sum(1 for u, _, _ in self.in_edges[vertex] if not contracted[u])
+                 + sum(1 for w, _, _ in self.out_edges[vertex] if not contracted[w]))
+        return 2 * (len(self.needed_shortcuts(vertex)) - edges) + self.contracted_neighbors[vertex]
+
+    def witness_search(self, source, excluded, targets):
+        # Dijkstra from source among the remaining cities except excluded,
+        # until every (target, distance) of targets is settled or too far;
+        # the results stay in distance / stamp
+        self.generation += 1
+        generation = self.generation
+        target_stamp = self.target_stamp
+        for target, _ in targets:
+            target_stamp[target] = generation
+        remaining = len(targets)
+        limit = max(distance for _, distance in targets)
+        stamp = self.stamp
+        distance = self.distance
+        contracted = self.contracted
+        heap = self.heap
+        stamp[source] = generation
+        distance[source] = 0
+        heap.push(source, 0)
+        settled = 0
+        while heap:
+            current_distance, current = heap.pop()
+            settled += 1
+            if current_distance > limit or settled > WITNESS_LIMIT:
+                break
+            if target_stamp[current] == generation:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            for neighbor, edge_distance, _ in self.out_edges[current]:
+                if contracted[neighbor] or neighbor == excluded:
+                    continue
+                tentative_distance = current_distance + edge_distance
+                if stamp[neighbor] != generation or tentative_distance < distance[neighbor]:
+                    stamp[neighbor] = generation
+                    distance[neighbor] = tentative_distance
+                    heap.push(neighbor, tentative_distance)
+        heap.clear()
+
+    def build_search_graph(self):
+        # Upward edges by their lower end, downward edges by their lower end
+        # too (the backward search follows them from the goal)
+        size = self.graph.vertex_count
+        rank = self.rank
+        typecode = self.graph.weights.typecode
+        self.up_offsets, self.up_targets = array('q', [0]), array('q')
+        self.up_weights, self.up_middles = array(typecode), array('q')
+        self.down_offsets, self.down_sources = array('q', [0]), array('q')
+        self.down_weights, self.down_middles = array(typecode), array('q')
+        for vertex in range(size):
+            for w, distance, middle in self.out_edges[vertex]:
+                if rank[w] > rank[vertex]:
+                    self.up_targets.append(w)
+                    self.up_weights.append(distance)
+                    self.up_middles.append(middle)
+            self.up_offsets.append(len(self.up_targets))
+            for u, distance, middle in self.in_edges[vertex]:
+                if rank[u] > rank[vertex]:
+                    self.down_sources.append(u)
+                    self.down_weights.append(distance)
+                    self.down_middles.append(middle)
+            self.down_offsets.append(len(self.down_sources))
+
+    # ---------- queries ----------
+
+    def search(self, start, goal):
+        # Shortest path from start to goal as a list of city names (the
+        # shortcuts unpacked), or None, like AStarEngine.search
+        start = self.graph.id(start)
+        goal = self.graph.id(goal)
+        if start is None or goal is None:
+            return None
+        meeting = self.meet(start, goal)
+        if meeting is None:
+            return None
+
+        # Edges start -> meeting and meeting -> goal, as (u, w, middle)
+        edges = []
+        vertex = meeting
+        while vertex != start:
+            u, i = self.parent[vertex]
+            edges.append((u, vertex, self.up_middles[i]))
+            vertex = u
+        edges.reverse()
+        vertex = meeting
+        while vertex != goal:
+            w, i = self.backward_parent[vertex]
+            edges.append((vertex, w, self.down_middles[i]))
+            vertex = w
+
+        path = [start]
+        for edge in edges:
+            path += self.unpack(*edge)
+        return [self.names[vertex] for vertex in path]
+
+    def meet(self, start, goal):
+        # Bidirectional upward Dijkstra; returns the city where the shortest
+        # path goes through the highest rank (None if there is no path)
+        self.generation += 1
+        generation = self.generation
+        stamps = (self.stamp, self.backward_stamp)
+        distances = (self.distance, self.backward_distance)
+        parents = (self.parent, self.backward_parent)
+        heaps = (self.heap, self.backward_heap)
+        graphs = ((self.up_offsets, self.up_targets, self.up_weights),
+                  (self.down_offsets, self.down_sources, self.down_weights))
+        best = float('inf')
+        meeting = None
+        try:
+            for side, vertex in ((0, start), (1, goal)):
+                stamps[side][vertex] = generation
+                distances[side][vertex] = 0
+                heaps[side].push(vertex, 0)
+
+            while True:
+                # Next city of the side with the smallest key, while it can
+                # still improve best
+                side = None
+                for candidate in (0, 1):
+                    heap = heaps[candidate]
+                    if heap and heap.peek()[0] < best and (side is None or heap.peek()[0] < heaps[side].peek()[0]):
+                        side = candidate
+                if side is None:
+                    break
+                current_distance, current = heaps[side].pop()
+                other = 1 - side
+                if stamps[other][current] == generation and current_distance + distances[other][current] < best:
+                    best = current_distance + distances[other][current]
+                    meeting = current
+
+                stamp, distance, parent, heap = stamps[side], distances[side], parents[side], heaps[side]
+                offsets, targets, weights = graphs[side]
+                for i in range(offsets[current], offsets[current + 1]):
+                    neighbor = targets[i]
+                    tentative_distance = current_distance + weights[i]
+                    if stamp[neighbor] != generation or tentative_distance < distance[neighbor]:
+                        stamp[neighbor] = generation
+                        distance[neighbor] = tentative_distance
+                        parent[neighbor] = (current, i)
+                        heap.push(neighbor, tentative_distance)
+        finally:
+            # Cleaned up even when the search is interrupted
+            self.heap.clear()
+            self.backward_heap.clear()
+        return meeting
+
+    def middle(self, u, w):
+        # City skipped by the road or shortcut u -> w (-1 for a road)
+        if self.rank[u] < self.rank[w]:
+            for i in range(self.up_offsets[u], self.up_offsets[u + 1]):
+                if self.up_targets[i] == w:
+                    return self.up_middles[i]
+        else:
+            for i in range(self.down_offsets[w], self.down_offsets[w + 1]):
+                if self.down_sources[i] == u:
+                    return self.down_middles[i]
+        raise ValueError(f"No edge from {self.names[u]} to {self.names[w]}")
+
+    def unpack(self, u, w, middle):
+        # Cities after u on the real roads of the edge u -> w
+        path = []
+        stack = [(u, w, middle)]
+        while stack:
+            u, w, middle = stack.pop()
+            if middle == -1:
+                path.append(w)
+            else:
+                # u -> middle first, so it is pushed last
+                stack.append((middle, w, self.middle(middle, w)))
+                stack.append((u, middle, self.middle(u, middle)))
+        return path
+
+
+if __name__ == "__main__":
+    # Same command line and output as astar.py, answered with the hierarchy
+    import sys
+
+    import weighted_graph as wg
+    from astar import data, print_path
+
+    graph = wg.WeightedGraph.from_map(data)
+    hierarchy = ContractionHierarchy(graph)
+    if len(sys.argv) == 3:
+        start_city, goal_city = sys.argv[1], sys.argv[2]
+    else:
+        start_city = input("Enter the name of the start city: ")
+        goal_city = input("Enter the name of the goal city: ")
+    if graph.ht.get(start_city) is None or graph.ht.get(goal_city) is None:
+        print("Error: Unknown city name")
+        sys.exit(1)
+    path = hierarchy.search(start_city, goal_city)
+    if path is None:
+        print("No path found")
+        sys.exit(3)
+    print_path(graph, path)
+    sys.exit(0)
@@ -0,0 +1,227 @@
+# ---------- Compiled Graph (compressed sparse row) ----------
+# Description: Frozen copy of a WeightedGraph where every city has a dense
+# integer id and the roads are stored in flat arrays, so that a search
+# follows roads with integer indexing instead of hashing city names. Names
+# are only used to enter (ids) and to leave (names) the compiled graph.
+# Made by WeightedGraph.compile(); it does not follow later changes.
+
+# structure: names:   list id -> city name
+#            ids:     HashTable city name -> id
+#            offsets: array of V + 1 positions; the roads of city i are at
+#                     positions offsets[i] .. offsets[i + 1] - 1 of
+#            targets: array of the ids of the neighbors, and
+#            weights: array of the road distances
+#            xs, ys:  arrays of the coordinates (nan when unknown)
+# Number of vertices: V, number of roads: E (each direction counted)
+
+from array import array
+
+from hash_table import HashTable
+from indexed_heap import DenseIndexedHeap
+from union_find import UnionFind
+
+
+class CompiledGraph:
+    def __init__(self, names, ids, offsets, targets, weights, xs, ys, scale=1, consistent_scale=0):
+        self.names = names
+        self.ids = ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.xs = xs
+        self.ys = ys
+        self.scale = scale
+        self.consistent_scale = consistent_scale
+        # UnionFind of the city ids, made by the first connected()
+        self.components = None
+
+    @classmethod
+    def from_graph(cls, graph):
+        names = graph.vertices
+        ids = HashTable.from_items((name, i) for i, name in enumerate(names))
+        offsets = array('q', [0])
+        targets = array('q')
+        distances = []
+        xs = array('d')
+        ys = array('d')
+        for name in names:
+            x, y, edges = graph.ht.get(name)
+            for neighbor, distance in edges:
+                targets.append(ids.get(neighbor))
+                distances.append(distance)
+            offsets.append(len(targets))
+            xs.append(float('nan') if x is None else x)
+            ys.append(float('nan') if y is None else y)
+        # Integer distances (as in FRANCE.MAP) stay integers
+        weights = array('q' if all(isinstance(distance, int) for distance in distances) else 'd', distances)
+        return cls(names, ids, offsets, targets, weights, xs, ys, graph.scale, graph.consistent_scale)
+
+    def __str__(self):
+        return f"CompiledGraph<{self.vertex_count}, {self.edge_count}>"
+
+    @property
+    def vertex_count(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def compile(self):
+        return self
+
+    def id(self, name):
+        # Dense id of a city, or None
+        return self.ids.get(name)
+
+    def neighbors(self, vertex):
+        # (id, distance) of the roads leaving a city id
+        start, end = self.offsets[vertex], self.offsets[vertex + 1]
+        return list(zip(self.targets[start:end], self.weights[start:end]))
+
+    def get_edge_distance(self, from_vertex, to_vertex):
+        # Same as WeightedGraph.get_edge_distance, with city names
+        start, end = self.id(from_vertex), self.id(to_vertex)
+        if start is None or end is None:
+            return None
+        for neighbor, distance in self.neighbors(start):
+            if neighbor == end:
+                return distance
+        return None
+
+    def update_components(self):
+        # Connectivity index of the city ids, in O(V + E alpha(V))
+        components = UnionFind(self.vertex_count)
+        offsets = self.offsets
+        targets = self.targets
+        for vertex in range(self.vertex_count):
+            for neighbor in targets[offsets[vertex]:offsets[vertex + 1]]:
+                components.union(vertex, neighbor)
+        self.components = components
+
+    def connected(self, from_vertex, to_vertex):
+        # Same as WeightedGraph.connected, with city names
+        if self.components is None:
+            self.update_components()
+        start, end = self.id(from_vertex), self.id(to_vertex)
+        return start is not None and end is not None and self.components.connected(start, end)
+
+    def component_sizes(self):
+        if self.components is None:
+            self.update_components()
+        return self.components.component_sizes()
+
+    def has_coordinates(self, vertex):
+        # nan is the only value not equal to itself
+        return self.xs[vertex] == self.xs[vertex] and self.ys[vertex] == self.ys[vertex]
+
+    def reversed(self):
+        # Same cities with every road turned around (the roads into a city
+        # become the roads out of it)
+        counts = [0] * (self.vertex_count + 1)
+        for target in self.targets:
+            counts[target + 1] += 1
+        offsets = array('q', counts)
+        for vertex in range(self.vertex_count):
+            offsets[vertex + 1] += offsets[vertex]
+        targets = array('q', bytes(8 * self.edge_count))
+        weights = array(self.weights.typecode, bytes(8 * self.edge_count))
+        position = list(offsets[:-1])
+        for vertex in range(self.vertex_count):
+            for i in range(self.offsets[vertex], self.offsets[vertex + 1]):
+                target = self.targets[i]
+                targets[position[target]] = vertex
+                weights[position[target]] = self.weights[i]
+                position[target] += 1
+        return CompiledGraph(self.names, self.ids, offsets, targets, weights, self.xs, self.ys,
+                             self.scale, self.consistent_scale)
+
+    def is_symmetric(self):
+        # True when every road has a road of the same length going back
+        reverse = self.reversed()
+        if reverse.offsets != self.offsets:
+            return False
+        return all(sorted(self.neighbors(vertex)) == sorted(reverse.neighbors(vertex))
+                   for vertex in range(self.vertex_count))
+
+    def shortest_distances(self, source, goals=None, previous=None):
+        # Dijkstra: road distance from the city id source to every city id
+        # (inf for the cities that cannot be reached). With a list of city
+        # ids goals, the search stops once they are all settled: only their
+        # distances are then final. With a list (or array) previous of V
+        # items, previous[v] is set to the city before v on its shortest path
+        # (left as it was for the source and the cities not reached)
+        distances = [float('inf')] * self.vertex_count
+        distances[source] = 0
+        offsets = self.offsets
+        targets = self.targets
+        weights = self.weights
+        done = bytearray(self.vertex_count)
+        remaining = -1
+        if goals is not None:
+            wanted = bytearray(self.vertex_count)
+            for goal in goals:
+                wanted[goal] = 1
+            remaining = sum(wanted)
+        heap = DenseIndexedHeap(self.vertex_count)
+        heap.push(source, 0)
+        while heap:
+            distance, vertex = heap.pop()
+            done[vertex] = 1
+            if remaining > 0 and wanted[vertex]:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            first, last = offsets[vertex], offsets[vertex + 1]
+            for neighbor, weight in zip(targets[first:last], weights[first:last]):
+                if not done[neighbor] and distance + weight < distances[neighbor]:
+                    distances[neighbor] = distance + weight
+                    heap.push(neighbor, distance + weight)
+                    if previous is not None:
+                        previous[neighbor] = vertex
+        return distances
+
+    def breadth_first_search(self, start):
+        # Names of the cities reachable from start, in breadth-first order
+        start = self.id(start)
+        if start is None:
+            return []
+        offsets = self.offsets
+        targets = self.targets
+        visited = bytearray(self.vertex_count)
+        visited[start] = 1
+        queue = [start]
+        head = 0
+        while head < len(queue):
+            vertex = queue[head]
+            head += 1
+            for neighbor in targets[offsets[vertex]:offsets[vertex + 1]]:
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    queue.append(neighbor)
+        return [self.names[vertex] for vertex in queue]
+
+    def depth_first_search(self, start):
+        # Names of the cities reachable from start, in the order of
+        # Graph.depth_first_search (marked when pushed, last pushed first)
+        start = self.id(start)
+        if start is None:
+            return []
+        offsets = self.offsets
+        targets = self.targets
+        visited = bytearray(self.vertex_count)
+        visited[start] = 1
+        stack = [start]
+        order = []
+        while stack:
+            vertex = stack.pop()
+            order.append(vertex)
+            for neighbor in targets[offsets[vertex]:offsets[vertex + 1]]:
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    stack.append(neighbor)
+        return [self.names[vertex] for vertex in order]
+
+    def display(self):
+        for vertex, name in enumerate(self.names):
+            print(f"{vertex} {name} -> {self.neighbors(vertex)}")
@@ -0,0 +1,248 @@
+# ---------- Cuckoo Hash Table ----------
+# Description: Same interface as HashTable, but a key can only be in one of
+# `ways` slots (one per sub-table, each with its own hash function) or in a
+# small stash, so a lookup looks at ways + STASH_SIZE slots at most, whatever
+# the keys. A new key that finds its slots taken evicts one of the pairs,
+# which moves to one of its other slots, and so on ("cuckoo").
+
+# structure: List of (key, value) pairs, made of `ways` sub-tables of 2^bits
+#            slots each (sub-table i starts at i << bits), and the stash,
+#            a list of at most STASH_SIZE pairs
+# Number of pairs: n (in the sub-tables and in the stash)
+# Capacity of the hash table: m = ways * 2^bits
+#
+# Slot of a key in sub-table i: multiplicative hashing, the top bits of
+# hash(key) * seeds[i] (mod 2^64). When an eviction chain is too long and the
+# stash is full, the table is rebuilt with new seeds.
+#
+# Keys with the same hash() share all their slots, and no seed or capacity
+# can separate them: with more than ways + STASH_SIZE such keys, every
+# rebuild fails. After MAX_REBUILDS failed rebuilds the stash is allowed to
+# grow instead (stash_size), and the lookups of those keys are no longer
+# bounded.
+
+import random
+
+from hash_table import DELETE, GET, SET, HashTable
+
+MASK = (1 << 64) - 1
+STASH_SIZE = 4
+MAX_REBUILDS = 8
+
+
+class CuckooHashTable(HashTable):
+    def __init__(self, capacity=10, ways=2):
+        if ways < 2:
+            raise ValueError("A cuckoo hash table needs at least 2 ways")
+        self.ways = ways
+        super().__init__(self.capacity_for_slots(capacity))
+        self.probing = 'cuckoo'
+        # Above these load factors, insertions start failing quickly
+        self.max_load_factor = 0.45 if ways == 2 else 0.8
+        # Pairs the stash may hold before the table must be rebuilt
+        self.stash_size = STASH_SIZE
+        self.resize(self.capacity)
+
+    def __str__(self):
+        return f"CuckooHashTable<{self.ways}, {self.capacity}, {self.size}, {self.items()}>"
+
+    def capacity_for_slots(self, capacity):
+        # Smallest ways * 2^bits that is at least capacity
+        per_way = -(-capacity // self.ways)
+        return self.ways << max(per_way - 1, 1).bit_length()
+
+    def resize(self, capacity):
+        # Empty table with the given capacity and new hash functions
+        self.bits = (capacity // self.ways).bit_length() - 1
+        self.capacity = self.ways << self.bits
+        self.table = [None] * self.capacity
+        self.stash = []
+        self.offsets = [way << self.bits for way in range(self.ways)]
+        self.seeds = [random.getrandbits(64) | 1 for _ in range(self.ways)]
+        self.max_kicks = 16 + 4 * self.bits
+
+    def slots(self, key):
+        h = hash(key) & MASK
+        shift = 64 - self.bits
+        return [offset | (h * seed & MASK) >> shift for offset, seed in zip(self.offsets, self.seeds)]
+
+    def keys(self):
+        return [pair[0] for pair in self.items()]
+
+    def values(self):
+        return [pair[1] for pair in self.items()]
+
+    def items(self):
+        return [pair for pair in self.table if pair is not None] + self.stash
+
+    def get(self, key, default=None):
+        table = self.table
+        h = hash(key) & MASK
+        shift = 64 - self.bits
+        probes = 0
+        value = default
+        for offset, seed in zip(self.offsets, self.seeds):
+            probes += 1
+            pair = table[offset | (h * seed & MASK) >> shift]
+            if pair is not None and pair[0] == key:
+                value = pair[1]
+                break
+        else:
+            for pair in self.stash:
+                probes += 1
+                if pair[0] == key:
+                    value = pair[1]
+                    break
+
+        if self.stats is not None:
+            self.stats.record(GET, probes)
+        return value
+
+    def set(self, key, value):
+        indexes = self.slots(key)
+        probes = 0
+        for index in indexes:
+            probes += 1
+            pair = self.table[index]
+            if pair is not None and pair[0] == key:
+                self.table[index] = (key, value)
+                if self.stats is not None:
+                    self.stats.record(SET, probes)
+                return
+        for i, pair in enumerate(self.stash):
+            probes += 1
+            if pair[0] == key:
+                self.stash[i] = (key, value)
+                if self.stats is not None:
+                    self.stats.record(SET, probes)
+                return
+
+        if self.load_factor() > self.max_load_factor:
+            self.grow()
+            indexes = None
+        kicks = self.insert((key, value), indexes)
+        self.size += 1
+        if kicks is None:
+            if self.stash_size > STASH_SIZE:
+                # The last rebuild could not separate the keys: a new one
+                # would not either
+                self.stash_size += 1
+            else:
+                # The last evicted pair has no slot left: new hash functions
+                self.rehash(self.capacity)
+            kicks = self.max_kicks
+        if self.stats is not None:
+            self.stats.record(SET, probes + kicks)
+
+    def insert(self, pair, indexes=None):
+        # Place a pair whose key is not in the table yet (indexes: its slots,
+        # if already known), evicting other pairs if needed. Returns the
+        # number of evictions, or None when the pair that was left over did
+        # not fit in the stash either (it is still kept in the stash, and the
+        # table must be rebuilt)
+        table = self.table
+        way = -1
+        for kicks in range(self.max_kicks):
+            if indexes is None:
+                indexes = self.slots(pair[0])
+            for index in indexes:
+                if table[index] is None:
+                    table[index] = pair
+                    return kicks
+            # Never evict from the sub-table the pair was just evicted from
+            if way < 0:
+                way = random.randrange(self.ways)
+            else:
+                way = (way + 1 + random.randrange(self.ways - 1)) % self.ways
+            index = indexes[way]
+            table[index], pair = pair, table[index]
+            indexes = None
+        self.stash.append(pair)
+        if len(self.stash) > self.stash_size:
+            return None
+        return self.max_kicks
+
+    def delete(self, key):
+        probes = 0
+        found = False
+        for index in self.slots(key):
+            probes += 1
+            pair = self.table[index]
+            if pair is not None and pair[0] == key:
+                self.table[index] = None
+                found = True
+                break
+        else:
+            for i, pair in enumerate(self.stash):
+                probes += 1
+                if pair[0] == key:
+                    self.stash.pop(i)
+                    found = True
+                    break
+
+        if self.stats is not None:
+            self.stats.record(DELETE, probes)
+        if not found:
+            return
+        self.size -= 1
+
+        if self.capacity > self.min_capacity and self.size < self.capacity * self.min_load_factor:
+            self.shrink()
+        elif self.stash:
+            # A slot was freed: move back the stashed pairs that now fit
+            for pair in list(self.stash):
+                for index in self.slots(pair[0]):
+                    if self.table[index] is None:
+                        self.table[index] = pair
+                        self.stash.remove(pair)
+                        break
+
+    def get_many(self, keys, default=None):
+        return [self.get(key, default) for key in keys]
+
+    def set_many(self, pairs):
+        if not isinstance(pairs, list):
+            pairs = list(pairs)
+        self.make_room(len(pairs))
+        for key, value in pairs:
+            self.set(key, value)
+
+    def capacity_for(self, n):
+        return self.capacity_for_slots(int(n / self.max_load_factor) + 1)
+
+    def rebuild(self, capacity):
+        # Try new hash functions until every pair fits; double the capacity
+        # after a few failures. After MAX_REBUILDS failures, the pairs left
+        # over stay in a larger stash
+        pairs = self.items()
+        self.stash_size = STASH_SIZE
+        for attempt in range(1, MAX_REBUILDS + 1):
+            self.resize(self.capacity_for_slots(capacity))
+            if all(self.insert(pair) is not None for pair in pairs):
+                return
+            if attempt % 4 == 0 and attempt < MAX_REBUILDS:
+                capacity *= 2
+        self.stash_size = len(pairs)
+        self.resize(self.capacity_for_slots(capacity))
+        for pair in pairs:
+            self.insert(pair)
+        self.stash_size = max(STASH_SIZE, len(self.stash))
+
+    def probe_lengths(self):
+        # A get looks at the sub-tables in order, then at the stash
+        lengths = [index // (1 << self.bits) + 1 for index, pair in enumerate(self.table) if pair is not None]
+        return lengths + [self.ways + i + 1 for i in range(len(self.stash))]
+
+    def display(self):
+        print(f"CuckooHashTable[{', '.join(str(pair) for pair in self.items())}]")
+
+
+if __name__ == "__main__":
+    ht = CuckooHashTable()
+    for i in range(1000):
+        ht.set(i, i * i)
+    ht.delete(500)
+
+    print(ht.get(999))  # 998001
+    print(ht.get(500))  # None
+    print(ht.max_probe_length())  # at most 2 + STASH_SIZE
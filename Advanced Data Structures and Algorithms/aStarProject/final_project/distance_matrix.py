@@ -0,0 +1,148 @@
+# ---------- Distance matrix ----------
+# Description: Road distances between every source and every target of two
+# lists of cities, for the route planner. Instead of one A* per pair, one
+# Dijkstra runs per source on the compiled graph and stops once every target
+# is settled: its search tree answers all the targets at once. The sources
+# can be shared between worker processes.
+# Usage: python distance_matrix.py [--map map file] sources [targets] [output]
+#        [processes]
+#   map file:         map to use instead of the FRANCE.MAP copy of astar.py
+#   sources, targets: files with one city name per line (targets defaults to
+#                     sources)
+#   output:           .csv, - for the terminal (the default, as csv) or
+#                     binary (any other name)
+#   processes:        number of worker processes (default 1, 0 for one per
+#                     CPU)
+
+# structure: matrix: list of rows, matrix[i][j] = distance(sources[i],
+#                    targets[j]), inf when there is no path
+#
+# Binary format (write_binary / read_binary):
+#   header: magic, number of sources S, number of targets T
+#   S * T distances (float64, row by row), all little-endian
+
+import multiprocessing
+import struct
+import sys
+from array import array
+
+MAGIC = b'EPITADM1'
+HEADER = struct.Struct('<8sQQ')
+
+# Compiled graph of a worker process of the pool, set once by start_worker
+worker_graph = None
+
+
+def start_worker(graph):
+    global worker_graph
+    worker_graph = graph
+
+
+def distances_from(graph, source, goals):
+    distances = graph.shortest_distances(source, goals)
+    return [distances[goal] for goal in goals]
+
+
+def distance_row(source, goals):
+    # Row computed by a worker process
+    return distances_from(worker_graph, source, goals)
+
+
+def distance_matrix(graph, sources, targets, processes=1):
+    # Rows of distances from every source name to every target name
+    graph = graph.compile()
+    ids = []
+    for names in (sources, targets):
+        ids.append([graph.id(name) for name in names])
+        for name, vertex in zip(names, ids[-1]):
+            if vertex is None:
+                raise ValueError(f"Unknown city name: {name}")
+    source_ids, target_ids = ids
+
+    if processes == 1:
+        return [distances_from(graph, source, target_ids) for source in source_ids]
+    # processes=None lets the pool use one process per CPU
+    with multiprocessing.Pool(processes or None, start_worker, (graph,)) as pool:
+        return pool.starmap(distance_row, [(source, target_ids) for source in source_ids])
+
+
+def write_csv(file, sources, targets, matrix):
+    # First row: the targets, then one row per source starting with its name
+    file.write(",".join([""] + targets) + "\n")
+    for source, row in zip(sources, matrix):
+        file.write(",".join([source] + [str(distance) for distance in row]) + "\n")
+
+
+def write_binary(path, matrix, columns):
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(matrix), columns))
+        for row in matrix:
+            values = array('d', row)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            values.tofile(file)
+
+
+def read_binary(path):
+    with open(path, 'rb') as file:
+        magic, rows, columns = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a distance matrix file")
+        values = array('d')
+        values.fromfile(file, rows * columns)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return [values[i * columns:(i + 1) * columns].tolist() for i in range(rows)]
+
+
+def read_names(path):
+    with open(path) as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+if __name__ == "__main__":
+    import map_file
+    from astar import data
+
+    arguments = sys.argv[1:]
+    map_path = None
+    if len(arguments) >= 2 and arguments[0] == "--map":
+        map_path = arguments[1]
+        arguments = arguments[2:]
+    if not arguments:
+        print("Usage: python distance_matrix.py [--map map file] sources [targets] [output] [processes]")
+        sys.exit(2)
+    try:
+        sources = read_names(arguments[0])
+        targets = read_names(arguments[1]) if len(arguments) > 1 else sources
+    except OSError as error:
+        print(f"Error: {error}")
+        sys.exit(2)
+    output = arguments[2] if len(arguments) > 2 else None
+    processes = int(arguments[3]) if len(arguments) > 3 else 1
+
+    if map_path is None:
+        graph = map_file.compile_map(data.split('\n'))
+    else:
+        try:
+            graph = map_file.load_map(map_path)
+        except OSError:
+            print(f"Error: Cannot read the map file {map_path}")
+            sys.exit(2)
+        except map_file.MapFormatError as error:
+            print(f"Error: {map_path}: {error}")
+            sys.exit(2)
+
+    try:
+        matrix = distance_matrix(graph, sources, targets, processes)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    if output is None or output == "-":
+        write_csv(sys.stdout, sources, targets, matrix)
+    elif output.endswith(".csv"):
+        with open(output, 'w') as file:
+            write_csv(file, sources, targets, matrix)
+    else:
+        write_binary(output, matrix, len(targets))
+    sys.exit(0)
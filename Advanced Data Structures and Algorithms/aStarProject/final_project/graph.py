@@ -1,10 +1,24 @@
 from hash_table import *
+from weighted_graph import parse_map
 
 class Graph:
-    def __init__(self, directional=False, capacity=100):
+    def __init__(self, directional=False, capacity=100, table_class=HashTable):
         self.directional = directional
-        self.ht = HashTable(capacity)
+        self.ht = table_class(capacity)
         self.distances = {}
+
+    @classmethod
+    def from_map(cls, text, table_class=HashTable):
+        # The map lists every road from both of its ends, so the adjacency
+        # lists are taken as they are instead of going through add_edge
+        cities = parse_map(text)
+        graph = cls(directional=True, table_class=table_class)
+        graph.ht = table_class.from_items(((city, [neighbor for neighbor, _ in edges]) for city, _, _, edges in cities),
+                                          expected_size=len(cities))
+        for city, _, _, edges in cities:
+            for neighbor, distance in edges:
+                graph.distances[(city, neighbor)] = distance
+        return graph
     
     def __str__(self):
         return f"#Graph<{self.directional}_{self.capacity}>"
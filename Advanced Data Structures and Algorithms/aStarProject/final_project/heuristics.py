@@ -0,0 +1,99 @@
+# ---------- A* heuristics ----------
+# Description: Distances between the coordinates of two cities, used by A*
+# as an estimate of the road distance left to the goal.
+#   euclidean:    straight line on a plane (FRANCE.MAP coordinates)
+#   manhattan:    |dx| + |dy| on a plane
+#   great_circle: coordinates are (longitude, latitude) in degrees, distance
+#                 in km along the surface of the Earth (haversine formula)
+#
+# None of them is in the unit of the road distances, so A* multiplies them by
+# the scale of the graph for that heuristic: the smallest ratio road distance
+# / heuristic distance over all the roads. All three distances satisfy the
+# triangle inequality, so the scaled heuristic is consistent, not only
+# admissible.
+#
+# estimates() computes the heuristic of every city at once, with NumPy when
+# it is installed (it is optional) and with a plain loop otherwise.
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HEURISTICS = ('euclidean', 'manhattan', 'great_circle')
+
+EARTH_RADIUS = 6371.0
+
+
+def euclidean(x1, y1, x2, y2):
+    return math.hypot(x1 - x2, y1 - y2)
+
+
+def manhattan(x1, y1, x2, y2):
+    return abs(x1 - x2) + abs(y1 - y2)
+
+
+def great_circle(x1, y1, x2, y2):
+    longitude1, latitude1, longitude2, latitude2 = map(math.radians, (x1, y1, x2, y2))
+    a = (math.sin((latitude2 - latitude1) / 2) ** 2
+         + math.cos(latitude1) * math.cos(latitude2) * math.sin((longitude2 - longitude1) / 2) ** 2)
+    # Rounding (or latitudes out of [-90, 90]) can push a out of [0, 1]
+    if a > 1:
+        a = 1
+    elif a < 0:
+        a = 0
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def distance_function(heuristic):
+    if heuristic == 'euclidean':
+        return euclidean
+    if heuristic == 'manhattan':
+        return manhattan
+    if heuristic == 'great_circle':
+        return great_circle
+    raise ValueError(f"Unknown heuristic: {heuristic}")
+
+
+def scale(graph, heuristic):
+    # Smallest ratio road distance / heuristic distance over the roads of a
+    # compiled graph (1 if no road has two distinct known ends)
+    distance = distance_function(heuristic)
+    xs, ys = graph.xs, graph.ys
+    smallest = None
+    for vertex in range(graph.vertex_count):
+        if not graph.has_coordinates(vertex):
+            continue
+        for neighbor, road in graph.neighbors(vertex):
+            if not graph.has_coordinates(neighbor):
+                continue
+            straight = distance(xs[vertex], ys[vertex], xs[neighbor], ys[neighbor])
+            if straight > 0 and (smallest is None or road / straight < smallest):
+                smallest = road / straight
+    return 1 if smallest is None else smallest
+
+
+def estimates(graph, heuristic, x, y, factor=1):
+    # factor * distance from every city of a compiled graph to (x, y), as a
+    # list indexed by id (nan for the cities without coordinates)
+    if numpy is None:
+        distance = distance_function(heuristic)
+        return [factor * distance(xi, yi, x, y) for xi, yi in zip(graph.xs, graph.ys)]
+
+    xs = numpy.frombuffer(graph.xs, dtype=numpy.float64)
+    ys = numpy.frombuffer(graph.ys, dtype=numpy.float64)
+    if heuristic == 'euclidean':
+        result = numpy.hypot(xs - x, ys - y)
+    elif heuristic == 'manhattan':
+        result = numpy.abs(xs - x) + numpy.abs(ys - y)
+    elif heuristic == 'great_circle':
+        longitudes, latitudes = numpy.radians(xs), numpy.radians(ys)
+        longitude, latitude = math.radians(x), math.radians(y)
+        a = (numpy.sin((latitudes - latitude) / 2) ** 2
+             + numpy.cos(latitudes) * math.cos(latitude) * numpy.sin((longitudes - longitude) / 2) ** 2)
+        result = 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0, 1)))
+    else:
+        raise ValueError(f"Unknown heuristic: {heuristic}")
+    return (factor * result).tolist()
@@ -0,0 +1,155 @@
+# ---------- Indexed Binary Heap ----------
+# Description: Min-heap of items ordered by priority, with decrease-key.
+# Used as the open set of A*: push() either inserts a node or lowers the
+# priority of the node already in the heap, so the heap never holds the same
+# node twice and pop() never returns a stale entry.
+
+# structure: List of entries [priority, item, position] kept as a binary
+#            heap (children of position i at 2i + 1 and 2i + 2), and a
+#            HashTable item -> entry to find an item in the heap
+# Number of items: n
+# push, pop: O(log n), contains, priority: O(1)
+
+from hash_table import HashTable
+
+
+class IndexedHeap:
+    def __init__(self, capacity=100):
+        self.heap = []
+        self.entries = HashTable(capacity)
+
+    def __str__(self):
+        return f"IndexedHeap<{len(self.heap)}, {[(entry[0], entry[1]) for entry in self.heap]}>"
+
+    def __len__(self):
+        return len(self.heap)
+
+    def contains(self, item):
+        return self.entries.contains(item)
+
+    def priority(self, item):
+        entry = self.entries.get(item)
+        return None if entry is None else entry[0]
+
+    def peek(self):
+        return self.heap[0][0], self.heap[0][1]
+
+    def push(self, item, priority):
+        # Insert the item, or lower its priority if it is already in the heap
+        # (a higher priority than the current one is ignored)
+        entry = self.entries.get(item)
+        if entry is None:
+            entry = [priority, item, len(self.heap)]
+            self.heap.append(entry)
+            self.entries.set(item, entry)
+        elif priority < entry[0]:
+            entry[0] = priority
+        else:
+            return
+        self.sift_up(entry[2])
+
+    def pop(self):
+        # Remove and return the (priority, item) of smallest priority
+        heap = self.heap
+        entry = heap[0]
+        last = heap.pop()
+        if heap:
+            last[2] = 0
+            heap[0] = last
+            self.sift_down(0)
+        self.entries.delete(entry[1])
+        return entry[0], entry[1]
+
+    def sift_up(self, position):
+        heap = self.heap
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) // 2
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[position] = heap[parent]
+            heap[position][2] = position
+            position = parent
+        heap[position] = entry
+        entry[2] = position
+
+    def sift_down(self, position):
+        heap = self.heap
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] <= heap[child][0]:
+                break
+            heap[position] = heap[child]
+            heap[position][2] = position
+            position = child
+        heap[position] = entry
+        entry[2] = position
+
+
+# ---------- Dense Indexed Binary Heap ----------
+# Description: Same heap, for items that are dense integer ids 0 .. size - 1:
+# the entry of an item is found in a list instead of a HashTable. clear()
+# only visits the entries still in the heap, so a heap reused for many
+# searches costs nothing per search for the items it never saw.
+
+# structure: List of entries [priority, item, position] kept as a binary
+#            heap, and a list id -> entry (None when not in the heap)
+
+
+class DenseIndexedHeap(IndexedHeap):
+    def __init__(self, size):
+        self.heap = []
+        self.entries = [None] * size
+
+    def contains(self, item):
+        return self.entries[item] is not None
+
+    def priority(self, item):
+        entry = self.entries[item]
+        return None if entry is None else entry[0]
+
+    def push(self, item, priority):
+        entry = self.entries[item]
+        if entry is None:
+            entry = [priority, item, len(self.heap)]
+            self.heap.append(entry)
+            self.entries[item] = entry
+        elif priority < entry[0]:
+            entry[0] = priority
+        else:
+            return
+        self.sift_up(entry[2])
+
+    def pop(self):
+        heap = self.heap
+        entry = heap[0]
+        last = heap.pop()
+        if heap:
+            last[2] = 0
+            heap[0] = last
+            self.sift_down(0)
+        self.entries[entry[1]] = None
+        return entry[0], entry[1]
+
+    def clear(self):
+        for entry in self.heap:
+            self.entries[entry[1]] = None
+        self.heap = []
+
+
+if __name__ == "__main__":
+    heap = IndexedHeap()
+    heap.push("Paris", 640)
+    heap.push("Lyon", 825)
+    heap.push("Nantes", 107)
+    heap.push("Lyon", 436)  # decrease-key
+    heap.push("Nantes", 900)  # ignored, higher than 107
+
+    while heap:
+        print(heap.pop())  # (107, 'Nantes'), (436, 'Lyon'), (640, 'Paris')
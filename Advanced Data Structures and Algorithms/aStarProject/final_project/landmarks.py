@@ -0,0 +1,176 @@
+# ---------- ALT landmarks (A*, Landmarks, Triangle inequality) ----------
+# Description: Preprocessing for A* on large maps. A few cities are chosen as
+# landmarks L and the road distances from (and to) every landmark are stored.
+# By the triangle inequality, for any cities v and t:
+#   distance(v, t) >= distance(L, t) - distance(L, v)
+#   distance(v, t) >= distance(v, L) - distance(t, L)
+# and the largest of these bounds over all landmarks is an A* heuristic that
+# is admissible and consistent, and much closer to the real distance than the
+# straight line, so A* expands far fewer cities.
+
+# structure: ids:      list of the city ids of the k landmarks
+#            forward:  k arrays, forward[i][v] = distance(landmark i, v)
+#            backward: k arrays, backward[i][v] = distance(v, landmark i)
+#                      (the same arrays as forward when every road goes
+#                      both ways with the same length, as in FRANCE.MAP)
+#            inf for the cities that cannot be reached
+#
+# File format (save / load), so the preprocessing runs once per map:
+#   header: magic, V, E, crc32 of the city names, k, symmetric (0 or 1)
+#   k landmark ids (int64), then the k forward arrays and, if not symmetric,
+#   the k backward arrays (V float64 each), all little-endian
+
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b'EPITALM1'
+HEADER = struct.Struct('<8sQQIIB')
+
+
+def fingerprint(graph):
+    # Identifies the map a landmark file was computed for
+    return zlib.crc32('\n'.join(graph.names).encode())
+
+
+class Landmarks:
+    def __init__(self, graph, ids, forward, backward):
+        self.graph = graph
+        self.ids = ids
+        self.forward = forward
+        self.backward = backward
+
+    @classmethod
+    def select(cls, graph, k=8):
+        # Farthest landmarks: the first one is the city farthest from a city
+        # of the largest component (where most queries are), each next one
+        # the city farthest from the landmarks already chosen
+        graph = graph.compile()
+        symmetric = graph.is_symmetric()
+        reverse = None if symmetric else graph.reversed()
+        k = min(k, graph.vertex_count)
+        ids, forward, backward = [], [], []
+        closest = []
+        if graph.vertex_count:
+            if graph.components is None:
+                graph.update_components()
+            seed = max(range(graph.vertex_count), key=graph.components.size)
+            closest = graph.shortest_distances(seed)
+        for _ in range(k):
+            # Cities that cannot be reached are never landmarks
+            farthest = max(((distance, vertex) for vertex, distance in enumerate(closest)
+                            if distance != float('inf')), default=None)
+            if farthest is None or farthest[0] < 0:
+                break
+            candidate = farthest[1]
+            ids.append(candidate)
+            forward.append(array('d', graph.shortest_distances(candidate)))
+            if not symmetric:
+                backward.append(array('d', reverse.shortest_distances(candidate)))
+            if len(ids) == 1:
+                closest = list(forward[0])
+            else:
+                closest = [min(a, b) for a, b in zip(closest, forward[-1])]
+            for landmark in ids:
+                closest[landmark] = -1
+        return cls(graph, ids, forward, forward if symmetric else backward)
+
+    @classmethod
+    def load(cls, path, graph):
+        graph = graph.compile()
+        with open(path, 'rb') as file:
+            magic, vertices, edges, names, k, symmetric = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a landmark file")
+            if (vertices, edges, names) != (graph.vertex_count, graph.edge_count, fingerprint(graph)):
+                raise ValueError(f"{path} was computed for another map")
+            ids = array('q')
+            ids.fromfile(file, k)
+            tables = []
+            for _ in range(k if symmetric else 2 * k):
+                table = array('d')
+                table.fromfile(file, vertices)
+                tables.append(table)
+        if sys.byteorder == 'big':
+            ids.byteswap()
+            for table in tables:
+                table.byteswap()
+        forward = tables[:k]
+        backward = forward if symmetric else tables[k:]
+        return cls(graph, list(ids), forward, backward)
+
+    @classmethod
+    def load_or_select(cls, path, graph, k=8):
+        # Landmarks of path if it matches the map, else computed and saved there
+        try:
+            return cls.load(path, graph)
+        except (OSError, ValueError, EOFError):
+            landmarks = cls.select(graph, k)
+            landmarks.save(path)
+            return landmarks
+
+    def __str__(self):
+        return f"Landmarks<{[self.graph.names[landmark] for landmark in self.ids]}>"
+
+    @property
+    def symmetric(self):
+        return self.backward is self.forward
+
+    def save(self, path):
+        graph = self.graph
+        tables = self.forward if self.symmetric else self.forward + self.backward
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, graph.vertex_count, graph.edge_count, fingerprint(graph),
+                                   len(self.ids), self.symmetric))
+            for values in [array('q', self.ids)] + tables:
+                if sys.byteorder == 'big':
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(file)
+
+    def estimator(self, goal, reverse=False):
+        # Function city id -> lower bound of the road distance to the city id
+        # goal (from goal with reverse). A difference with an inf is inf (the
+        # goal cannot be reached), -inf or nan, and the last two are never
+        # larger than best
+        forward = [(table, table[goal]) for table in self.forward]
+        backward = [(table, table[goal]) for table in self.backward]
+        symmetric = self.symmetric
+        if reverse:
+            # distance(goal, v) >= distance(goal, L) - distance(v, L) and
+            # distance(goal, v) >= distance(L, v) - distance(L, goal): the
+            # same two bounds with the tables swapped
+            forward, backward = backward, forward
+
+        def estimate(vertex):
+            best = 0
+            if symmetric:
+                for table, to_goal in forward:
+                    bound = abs(to_goal - table[vertex])
+                    if bound > best:
+                        best = bound
+                return best
+            for table, to_goal in forward:
+                bound = to_goal - table[vertex]
+                if bound > best:
+                    best = bound
+            for table, from_goal in backward:
+                bound = table[vertex] - from_goal
+                if bound > best:
+                    best = bound
+            return best
+
+        return estimate
+
+
+if __name__ == "__main__":
+    # Preprocess FRANCE.MAP: python landmarks.py [k] [file]
+    import weighted_graph as wg
+    from astar import data
+
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    path = sys.argv[2] if len(sys.argv) > 2 else "FRANCE.landmarks"
+    landmarks = Landmarks.select(wg.WeightedGraph.from_map(data), k)
+    landmarks.save(path)
+    print(f"{landmarks} saved to {path}")
@@ -0,0 +1,219 @@
+# ---------- Map files ----------
+# Description: Reads maps in the FRANCE.MAP format from a file, line by
+# line, so that a map of millions of lines is never held as one string.
+# read_map() yields the cities one block at a time and checks the format.
+# load_map() builds the compiled graph (csr_graph) directly from the blocks,
+# and writes it next to the map in a binary cache file: the next runs read
+# the cache in one go instead of parsing the map again.
+#
+# Format: blocks separated by blank lines
+#   City      x    y           (integers)
+#   Neighbor  distance         (integer >= 0), one line per road
+#   ...
+#
+# Cache format (map file name + ".cache"), all little-endian:
+#   header: magic, V, E, size and modification time of the map file, scale,
+#           consistent scale, length of the names
+#   offsets (V + 1 int64), targets (E int64), weights (E int64),
+#   xs, ys (V float64 each), the names (UTF-8, one per line)
+# The cache is only used while the size and modification time of the map
+# file are the ones it was made from.
+
+import os
+import struct
+import sys
+from array import array
+
+import heuristics
+from csr_graph import CompiledGraph
+from hash_table import HashTable
+
+MAGIC = b'EPITAMC1'
+HEADER = struct.Struct('<8sQQQqddQ')
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+def read_map(lines):
+    # Yields (city, x, y, [(neighbor, distance), ...]) for every block of an
+    # iterable of lines (a file or a list of strings); a wrong line raises
+    # MapFormatError with its number
+    block = None
+    number = 0
+    for number, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts:
+            if block is not None:
+                yield block
+                block = None
+            continue
+        try:
+            if block is None:
+                if len(parts) != 3:
+                    raise ValueError
+                block = (parts[0], int(parts[1]), int(parts[2]), [])
+            else:
+                if len(parts) != 2:
+                    raise ValueError
+                distance = int(parts[1])
+                if distance < 0:
+                    raise ValueError
+                block[3].append((parts[0], distance))
+        except ValueError:
+            expected = "City x y" if block is None else "Neighbor distance"
+            raise MapFormatError(f"line {number}: expected '{expected}', got '{line.strip()}'") from None
+    if block is not None:
+        yield block
+
+
+def compile_map(lines):
+    # CompiledGraph of the map, without building a WeightedGraph: ids are
+    # given in the order the cities are first seen (as a block or as a
+    # neighbor), and the roads of each block are moved to the CSR position
+    # of its city at the end
+    names = []
+    ids = HashTable(1024)
+    xs = array('d')
+    ys = array('d')
+    described = bytearray()
+    blocks = array('q')
+    starts = array('q', [0])
+    targets = array('q')
+    weights = array('q')
+
+    def vertex(name):
+        found = ids.get(name)
+        if found is None:
+            found = len(names)
+            names.append(name)
+            ids.set(name, found)
+            xs.append(float('nan'))
+            ys.append(float('nan'))
+            described.append(0)
+        return found
+
+    for city, x, y, edges in read_map(lines):
+        source = vertex(city)
+        if described[source]:
+            raise MapFormatError(f"city {city} is described twice")
+        described[source] = 1
+        xs[source] = x
+        ys[source] = y
+        for neighbor, distance in edges:
+            targets.append(vertex(neighbor))
+            weights.append(distance)
+        blocks.append(source)
+        starts.append(len(targets))
+
+    size = len(names)
+    offsets = array('q', bytes(8 * (size + 1)))
+    for i, source in enumerate(blocks):
+        offsets[source + 1] = starts[i + 1] - starts[i]
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    sorted_targets = array('q', bytes(8 * len(targets)))
+    sorted_weights = array('q', bytes(8 * len(targets)))
+    for i, source in enumerate(blocks):
+        first, last = starts[i], starts[i + 1]
+        position = offsets[source]
+        sorted_targets[position:position + last - first] = targets[first:last]
+        sorted_weights[position:position + last - first] = weights[first:last]
+
+    graph = CompiledGraph(names, ids, offsets, sorted_targets, sorted_weights, xs, ys)
+    # Same scale as WeightedGraph.update_scale
+    graph.scale = graph.consistent_scale = heuristics.scale(graph, 'euclidean')
+    return graph
+
+
+def cache_path(path):
+    return path + ".cache"
+
+
+def source_stamp(path):
+    status = os.stat(path)
+    return status.st_size, status.st_mtime_ns
+
+
+def save_cache(path, graph, stamp):
+    names = '\n'.join(graph.names).encode()
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, graph.vertex_count, graph.edge_count, stamp[0], stamp[1],
+                               graph.scale, graph.consistent_scale, len(names)))
+        for values in (graph.offsets, graph.targets, graph.weights, graph.xs, graph.ys):
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            values.tofile(file)
+        file.write(names)
+
+
+def load_cache(path, stamp):
+    # CompiledGraph of a cache file made from a map file with this stamp,
+    # or None if the file is missing, stale or damaged
+    try:
+        with open(path, 'rb') as file:
+            content = file.read()
+    except OSError:
+        return None
+    if len(content) < HEADER.size:
+        return None
+    magic, vertices, edges, size, mtime, scale, consistent_scale, length = HEADER.unpack_from(content)
+    if magic != MAGIC or (size, mtime) != stamp:
+        return None
+    if len(content) != HEADER.size + 8 * (3 * vertices + 2 * edges + 1) + length:
+        return None
+
+    view = memoryview(content)
+    position = HEADER.size
+    tables = []
+    for typecode, count in (('q', vertices + 1), ('q', edges), ('q', edges), ('d', vertices), ('d', vertices)):
+        values = array(typecode)
+        values.frombytes(view[position:position + 8 * count])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        tables.append(values)
+        position += 8 * count
+    try:
+        names = bytes(view[position:]).decode().split('\n') if vertices else []
+    except UnicodeDecodeError:
+        return None
+    if len(names) != vertices:
+        return None
+    ids = HashTable.from_items(((name, i) for i, name in enumerate(names)), expected_size=len(names))
+    offsets, targets, weights, xs, ys = tables
+    return CompiledGraph(names, ids, offsets, targets, weights, xs, ys, scale, consistent_scale)
+
+
+def load_map(path, cache=True):
+    # CompiledGraph of a map file, from its cache when it is up to date.
+    # OSError if the map cannot be read, MapFormatError if it is not valid;
+    # a cache that cannot be written is only skipped
+    stamp = source_stamp(path)
+    if cache:
+        graph = load_cache(cache_path(path), stamp)
+        if graph is not None:
+            return graph
+    with open(path) as file:
+        graph = compile_map(file)
+    if cache:
+        try:
+            save_cache(cache_path(path), graph, stamp)
+        except OSError:
+            pass
+    return graph
+
+
+if __name__ == "__main__":
+    # Check a map file and make its cache: python map_file.py [map file]
+    path = sys.argv[1] if len(sys.argv) > 1 else "FRANCE.MAP"
+    try:
+        graph = load_map(path)
+    except OSError as error:
+        print(f"Error: {error}")
+        sys.exit(2)
+    except MapFormatError as error:
+        print(f"Error: {path}: {error}")
+        sys.exit(2)
+    print(f"{graph} cached in {cache_path(path)}")
@@ -0,0 +1,135 @@
+# ---------- Shortest path tree cache ----------
+# Description: Answers repeated queries from the same start cities. The
+# first query from a start city is answered by A*; the second one runs
+# Dijkstra over the whole graph and keeps its shortest path tree (distance
+# and previous city of every city); every later query from that city only
+# walks the previous cities back from the goal, in O(length of the path).
+# A tree costs several A* queries, so start cities seen once do not get one.
+# At most capacity trees are kept, the least recently used one is dropped
+# when a new one is needed.
+# The cache follows the WeightedGraph it was made from: when add_vertex or
+# add_edge changes the graph (its version), every tree is dropped and the
+# graph is compiled again at the next query.
+
+# structure: entries: list city id -> tree of that start city, or None
+#            seen:    bytearray city id -> 1 once a query started there
+#            tree:    [start id, distances, previous, older, newer], in a
+#                     doubly linked list from the most recently used tree
+#                     (newer of the sentinel) to the least recently used one
+#                     (older of the sentinel)
+#            distances: array of V float64, previous: array of V int64
+# Memory: 16 V bytes per tree, so at most 16 V * capacity bytes
+
+from array import array
+
+from astar import AStarEngine
+
+START, DISTANCES, PREVIOUS, OLDER, NEWER = range(5)
+
+
+class PathCache:
+    def __init__(self, graph, capacity=16):
+        self.source = graph
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def __str__(self):
+        return f"PathCache<{self.size}/{self.capacity}, hits: {self.hits}, misses: {self.misses}>"
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        # Drop every tree and compile the graph as it is now (a compiled
+        # graph never changes, it has no version)
+        self.graph = self.source.compile()
+        self.version = getattr(self.source, 'version', 0)
+        self.entries = [None] * self.graph.vertex_count
+        self.seen = bytearray(self.graph.vertex_count)
+        self.engine = AStarEngine(self.graph)
+        self.sentinel = [None, None, None, None, None]
+        self.sentinel[OLDER] = self.sentinel[NEWER] = self.sentinel
+        self.size = 0
+
+    def unlink(self, tree):
+        tree[OLDER][NEWER] = tree[NEWER]
+        tree[NEWER][OLDER] = tree[OLDER]
+
+    def link_newest(self, tree):
+        sentinel = self.sentinel
+        tree[OLDER] = sentinel
+        tree[NEWER] = sentinel[NEWER]
+        sentinel[NEWER][OLDER] = tree
+        sentinel[NEWER] = tree
+
+    def tree(self, start):
+        # Shortest path tree of the city id start, computed if it is not kept
+        tree = self.entries[start]
+        if tree is not None:
+            self.unlink(tree)
+            self.link_newest(tree)
+            return tree
+
+        previous = array('q', [-1]) * self.graph.vertex_count
+        distances = array('d', self.graph.shortest_distances(start, previous=previous))
+        tree = [start, distances, previous, None, None]
+        if self.capacity == 0:
+            return tree
+        if self.size == self.capacity:
+            oldest = self.sentinel[OLDER]
+            self.unlink(oldest)
+            self.entries[oldest[START]] = None
+            self.size -= 1
+            self.evictions += 1
+        self.entries[start] = tree
+        self.link_newest(tree)
+        self.size += 1
+        return tree
+
+    def search(self, start, goal):
+        # Shortest path from start to goal as a list of city names, or None,
+        # like AStarEngine.search
+        if self.version != getattr(self.source, 'version', 0):
+            self.clear()
+        graph = self.graph
+        start_id = graph.id(start)
+        goal_id = graph.id(goal)
+        if start_id is None or goal_id is None:
+            return None
+        if self.entries[start_id] is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if not self.seen[start_id]:
+                self.seen[start_id] = 1
+                return self.engine.search(start, goal)
+
+        _, distances, previous, _, _ = self.tree(start_id)
+        if distances[goal_id] == float('inf'):
+            return None
+        path = []
+        current_node = goal_id
+        while current_node != -1:
+            path.append(graph.names[current_node])
+            current_node = previous[current_node]
+        path.reverse()
+        return path
+
+
+if __name__ == "__main__":
+    import weighted_graph as wg
+    from astar import data
+
+    graph = wg.WeightedGraph.from_map(data)
+    cache = PathCache(graph, capacity=2)
+    for start, goal in (("Rennes", "Lyon"), ("Rennes", "Nice"), ("Brest", "Nice"),
+                        ("Rennes", "Calais"), ("Paris", "Nice"), ("Brest", "Lyon")):
+        print(f"{start} -> {goal}: {cache.search(start, goal)}")
+    print(cache)  # hits: 1, misses: 5, trees of Rennes and Brest
+
+    # A new road: the trees are dropped
+    graph.add_edge("Brest", "Nice", 1000)
+    print(cache.search("Brest", "Nice"))  # ['Brest', 'Nice']
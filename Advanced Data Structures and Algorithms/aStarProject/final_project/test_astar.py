@@ -0,0 +1,275 @@
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import heuristics
+import map_file
+import weighted_graph as wg
+from astar import AStarEngine, SearchStats, a_star, data
+from contraction import ContractionHierarchy
+from landmarks import Landmarks
+from path_cache import PathCache
+
+
+def path_length(graph, path):
+    return sum(graph.get_edge_distance(a, b) for a, b in zip(path, path[1:]))
+
+
+class TestBidirectionalSearch(unittest.TestCase):
+    def setUp(self):
+        self.graph = wg.WeightedGraph.from_map(data)
+        self.engine = AStarEngine(self.graph)
+
+    def test_brest_nice(self):
+        path = self.engine.bidirectional_search("Brest", "Nice")
+        self.assertEqual(path, a_star(self.graph, "Brest", "Nice"))
+        self.assertEqual(path[0], "Brest")
+        self.assertEqual(path[-1], "Nice")
+
+    def test_fewer_expansions(self):
+        forward = SearchStats()
+        bidirectional = SearchStats()
+        self.engine.search("Brest", "Nice", forward)
+        self.engine.bidirectional_search("Brest", "Nice", bidirectional)
+        self.assertLess(bidirectional.expansions, forward.expansions)
+
+    def test_every_pair(self):
+        for start in self.graph.vertices:
+            for goal in self.graph.vertices:
+                expected = a_star(self.graph, start, goal)
+                path = self.engine.bidirectional_search(start, goal)
+                self.assertEqual(path, expected)
+                self.assertEqual(path_length(self.graph, path), path_length(self.graph, expected))
+
+    def test_every_pair_landmarks(self):
+        engine = AStarEngine(self.graph, landmarks=Landmarks.select(self.graph, 3))
+        for start in self.graph.vertices:
+            for goal in self.graph.vertices:
+                path = engine.bidirectional_search(start, goal)
+                expected = a_star(self.graph, start, goal)
+                self.assertEqual(path_length(self.graph, path), path_length(self.graph, expected))
+
+    def test_landmarks_of_another_map(self):
+        other = wg.WeightedGraph.from_map(data)
+        other.add_edge("Brest", "Nice", 2000)
+        with self.assertRaises(ValueError):
+            AStarEngine(self.graph, landmarks=Landmarks.select(other, 3))
+
+    def test_same_city(self):
+        self.assertEqual(self.engine.bidirectional_search("Lyon", "Lyon"), ["Lyon"])
+
+    def test_neighbors(self):
+        self.assertEqual(self.engine.bidirectional_search("Rennes", "Nantes"), ["Rennes", "Nantes"])
+
+    def test_unknown_city(self):
+        self.assertIsNone(self.engine.bidirectional_search("Brest", "Atlantis"))
+        self.assertIsNone(self.engine.bidirectional_search("Atlantis", "Brest"))
+
+    def test_no_path(self):
+        graph = wg.WeightedGraph.from_map(data + "\nAjaccio       0       -500\n")
+        engine = AStarEngine(graph)
+        self.assertIsNone(engine.bidirectional_search("Brest", "Ajaccio"))
+        self.assertIsNone(engine.bidirectional_search("Ajaccio", "Brest"))
+
+    def test_one_way_roads(self):
+        graph = wg.WeightedGraph.from_map(data)
+        # Going from Lyon to Dijon is much longer than coming back
+        graph.ht.get("Lyon")[2][:] = [(neighbor, distance * 3 if neighbor == "Dijon" else distance)
+                                      for neighbor, distance in graph.ht.get("Lyon")[2]]
+        engine = AStarEngine(graph)
+        for start, goal in (("Lyon", "Dijon"), ("Dijon", "Lyon"), ("Nice", "Paris"), ("Paris", "Nice")):
+            path = engine.bidirectional_search(start, goal)
+            self.assertEqual(path_length(graph, path), path_length(graph, a_star(graph, start, goal)))
+        self.assertIsNot(engine.reverse, engine.graph)
+
+
+class TestConnectivity(unittest.TestCase):
+    def setUp(self):
+        self.graph = wg.WeightedGraph.from_map(data + "\nAjaccio       0       -500\nBastia 150\n\n"
+                                                      "Bastia        100     -400\nAjaccio 150\n")
+
+    def test_components(self):
+        self.assertEqual(self.graph.component_sizes(), [19, 2])
+        self.assertEqual(self.graph.component_size("Brest"), 19)
+        self.assertEqual(self.graph.component_size("Atlantis"), 0)
+
+    def test_connected(self):
+        self.assertTrue(self.graph.connected("Brest", "Nice"))
+        self.assertTrue(self.graph.connected("Ajaccio", "Bastia"))
+        self.assertFalse(self.graph.connected("Brest", "Ajaccio"))
+        self.assertFalse(self.graph.connected("Brest", "Atlantis"))
+        self.assertIsNone(a_star(self.graph, "Brest", "Ajaccio"))
+
+    def test_add_edge(self):
+        self.graph.add_edge("Nice", "Bastia", 200)
+        self.assertTrue(self.graph.connected("Brest", "Ajaccio"))
+        self.assertEqual(self.graph.component_sizes(), [21])
+        self.graph.add_vertex("Corte", 120, -450)
+        self.assertEqual(self.graph.component_sizes(), [21, 1])
+        self.assertFalse(self.graph.connected("Corte", "Bastia"))
+
+    def test_compiled(self):
+        compiled = self.graph.compile()
+        self.assertTrue(compiled.connected("Brest", "Nice"))
+        self.assertFalse(compiled.connected("Bastia", "Lyon"))
+        self.assertEqual(compiled.component_sizes(), [19, 2])
+
+    def test_landmarks(self):
+        # The island is city 0: the landmarks must still be on the mainland
+        island = "Ajaccio       0       -500\nBastia 150\n\nBastia        100     -400\nAjaccio 150\n\n"
+        graph = map_file.compile_map((island + data).split("\n"))
+        self.assertEqual(graph.names[0], "Ajaccio")
+        landmarks = Landmarks.select(graph, 2)
+        self.assertEqual(graph.components.size(landmarks.ids[0]), 19)
+        self.assertEqual(graph.components.size(landmarks.ids[1]), 19)
+
+
+class TestMutation(unittest.TestCase):
+    def setUp(self):
+        self.graph = wg.WeightedGraph.from_map(data)
+        # A road much shorter than the straight line between its cities
+        self.graph.add_edge("Rennes", "Avignon", 1)
+        self.graph.add_edge("Avignon", "Rennes", 1)
+
+    def dijkstra(self, start, goal):
+        compiled = self.graph.compile()
+        return compiled.shortest_distances(compiled.id(start))[compiled.id(goal)]
+
+    def test_short_edge(self):
+        expected = self.dijkstra("Paris", "Marseille")
+        self.assertEqual(expected, 448)
+        self.assertEqual(path_length(self.graph, a_star(self.graph, "Paris", "Marseille")), expected)
+        engine = AStarEngine(self.graph)
+        self.assertEqual(path_length(self.graph, engine.search("Paris", "Marseille")), expected)
+        self.assertEqual(path_length(self.graph, engine.bidirectional_search("Paris", "Marseille")), expected)
+
+    def test_consistent_scale(self):
+        # Closed cities are skipped only while the heuristic stays consistent
+        self.assertEqual(self.graph.consistent_scale, self.graph.scale)
+        self.assertEqual(self.graph.scale, self.graph.edge_ratio("Rennes", "Avignon", 1))
+        engine = AStarEngine(self.graph)
+        for goal in self.graph.vertices:
+            expected = self.dijkstra("Brest", goal)
+            self.assertEqual(path_length(self.graph, a_star(self.graph, "Brest", goal)), expected)
+            self.assertEqual(path_length(self.graph, engine.search("Brest", goal)), expected)
+
+    def test_built_by_add_edge(self):
+        # A graph made city by city gets the same scales as from_map, so
+        # the searches skip the closed cities
+        graph = wg.WeightedGraph()
+        blocks = list(map_file.read_map(data.split("\n")))
+        for city, x, y, _ in blocks:
+            graph.add_vertex(city, x, y)
+        for city, _, _, edges in blocks:
+            for neighbor, distance in edges:
+                graph.add_edge(city, neighbor, distance)
+        reference = wg.WeightedGraph.from_map(data)
+        self.assertAlmostEqual(graph.scale, reference.scale)
+        self.assertAlmostEqual(graph.consistent_scale, reference.consistent_scale)
+        self.assertLessEqual(graph.scale, graph.consistent_scale)
+        engine = AStarEngine(graph)
+        self.assertLessEqual(engine.scale, engine.consistent_scale)
+        stats = SearchStats()
+        self.assertEqual(path_length(graph, a_star(graph, "Brest", "Nice", stats)), 1527)
+        self.assertEqual(stats.reopenings, 0)
+
+    def test_path_cache(self):
+        # The first answer after a change comes from A*, the second one from
+        # a shortest path tree: both must be the shortest path
+        graph = wg.WeightedGraph.from_map(data)
+        cache = PathCache(graph)
+        self.assertEqual(path_length(graph, cache.search("Paris", "Marseille")), 820)
+        graph.add_edge("Rennes", "Avignon", 1)
+        graph.add_edge("Avignon", "Rennes", 1)
+        first = cache.search("Paris", "Marseille")
+        second = cache.search("Paris", "Marseille")
+        self.assertEqual(path_length(graph, first), 448)
+        self.assertEqual(path_length(graph, second), 448)
+
+    def test_interrupted_search(self):
+        # A city without coordinates stops the search with an error; the
+        # next queries must not see what was left in the open sets
+        self.graph.add_edge("Brest", "Atlantis", 10)
+        engine = AStarEngine(self.graph)
+        for search in (engine.search, engine.bidirectional_search):
+            with self.assertRaises(ValueError):
+                search("Brest", "Nice")
+            self.assertEqual(len(engine.open_set), 0)
+            self.assertEqual(len(engine.backward_open_set), 0)
+            self.assertEqual(search("Nice", "Lyon"), ["Nice", "Marseille", "Avignon", "Lyon"])
+
+
+class TestMapCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "france.map")
+        with open(self.path, 'w') as file:
+            file.write(data)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache(self):
+        graph = map_file.load_map(self.path)
+        cached = map_file.load_cache(map_file.cache_path(self.path), map_file.source_stamp(self.path))
+        self.assertEqual(cached.names, graph.names)
+        self.assertEqual(list(cached.weights), list(graph.weights))
+
+    def test_damaged_names(self):
+        # Names that are not UTF-8 make the cache damaged, not an error
+        graph = map_file.load_map(self.path)
+        path = map_file.cache_path(self.path)
+        with open(path, 'r+b') as file:
+            file.seek(-2, os.SEEK_END)
+            file.write(b'\xff\xfe')
+        self.assertIsNone(map_file.load_cache(path, map_file.source_stamp(self.path)))
+        self.assertEqual(map_file.load_map(self.path).names, graph.names)
+
+
+class TestContractionHierarchy(unittest.TestCase):
+    def setUp(self):
+        self.graph = wg.WeightedGraph.from_map(data)
+        self.hierarchy = ContractionHierarchy(self.graph)
+
+    def test_every_pair(self):
+        for start in self.graph.vertices:
+            for goal in self.graph.vertices:
+                path = self.hierarchy.search(start, goal)
+                expected = a_star(self.graph, start, goal)
+                self.assertEqual(path_length(self.graph, path), path_length(self.graph, expected))
+
+    def test_interrupted_search(self):
+        # The heaps are emptied even when a query stops with an error
+        hierarchy = self.hierarchy
+        with mock.patch.object(hierarchy.backward_heap, "pop", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                hierarchy.search("Brest", "Nice")
+        self.assertEqual(len(hierarchy.heap), 0)
+        self.assertEqual(len(hierarchy.backward_heap), 0)
+        self.assertEqual(hierarchy.search("Nice", "Lyon"), ["Nice", "Marseille", "Avignon", "Lyon"])
+
+
+@unittest.skipUnless(heuristics.numpy is not None, "NumPy is not installed")
+class TestEstimates(unittest.TestCase):
+    def test_numpy(self):
+        # The NumPy branch gives the same estimates as the pure Python one
+        graph = wg.WeightedGraph.from_map(data)
+        graph.add_edge("Brest", "Atlantis", 10)
+        graph = graph.compile()
+        for heuristic in ("euclidean", "manhattan", "great_circle"):
+            fast = heuristics.estimates(graph, heuristic, 100, 500, 0.5)
+            with mock.patch.object(heuristics, "numpy", None):
+                expected = heuristics.estimates(graph, heuristic, 100, 500, 0.5)
+            self.assertIsInstance(fast, list)
+            self.assertEqual(len(fast), len(expected))
+            for value, expected_value in zip(fast, expected):
+                if math.isnan(expected_value):
+                    self.assertTrue(math.isnan(value))
+                else:
+                    self.assertAlmostEqual(value, expected_value)
+
+
+if __name__ == "__main__":
+    unittest.main()
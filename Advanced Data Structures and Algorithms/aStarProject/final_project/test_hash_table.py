@@ -0,0 +1,27 @@
+import unittest
+
+from cuckoo_hash_table import STASH_SIZE, CuckooHashTable
+
+# Integers that are multiples of 2^61 - 1 all have hash() 0
+SAME_HASH = 2 ** 61 - 1
+
+
+class TestCuckooHashTable(unittest.TestCase):
+    def test_same_hash(self):
+        # More keys with one hash than the slots and stash can hold: no
+        # rebuild can separate them, the stash grows instead
+        ht = CuckooHashTable()
+        for i in range(8):
+            ht.set(i * SAME_HASH, i)
+        self.assertEqual(ht.size, 8)
+        self.assertEqual([ht.get(i * SAME_HASH) for i in range(8)], list(range(8)))
+        self.assertGreater(ht.stash_size, STASH_SIZE)
+        self.assertLessEqual(ht.capacity, 64)
+        for i in range(8):
+            ht.delete(i * SAME_HASH)
+        self.assertEqual(ht.size, 0)
+        self.assertEqual(ht.items(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+# ---------- Union-Find (disjoint sets) ----------
+# Description: Groups items 0 .. n - 1 into connected components. union(a, b)
+# merges the components of a and b, connected(a, b) tells whether they are
+# in the same one. Used as a connectivity index of the road maps: two cities
+# in different components have no path between them, so a search between
+# them does not have to run. Components can only grow: removing a road
+# needs a new UnionFind.
+
+# structure: parent: list id -> parent id (a root is its own parent)
+#            sizes:  list id -> number of items of the component (only
+#                    meaningful for the roots)
+# Union by size and path halving: every operation is O(alpha(n)), a
+# constant in practice
+
+class UnionFind:
+    def __init__(self, size=0):
+        self.parent = list(range(size))
+        self.sizes = [1] * size
+        self.count = size
+
+    def __str__(self):
+        return f"UnionFind<{len(self.parent)}, {self.count} components>"
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add(self):
+        # New item in a component of its own; returns its id
+        self.parent.append(len(self.parent))
+        self.sizes.append(1)
+        self.count += 1
+        return len(self.parent) - 1
+
+    def find(self, item):
+        # Root of the component of item
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        # Merge the components of a and b; False if they were already one
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.sizes[a] < self.sizes[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.sizes[a] += self.sizes[b]
+        self.count -= 1
+        return True
+
+    def connected(self, a, b):
+        return self.find(a) == self.find(b)
+
+    def size(self, item):
+        # Number of items in the component of item
+        return self.sizes[self.find(item)]
+
+    def component_sizes(self):
+        # Sizes of all the components, largest first
+        return sorted((self.sizes[item] for item in range(len(self.parent)) if self.parent[item] == item),
+                      reverse=True)
+
+
+if __name__ == "__main__":
+    components = UnionFind(6)
+    components.union(0, 1)
+    components.union(1, 2)
+    components.union(4, 5)
+    print(components)  # UnionFind<6, 3 components>
+    print(components.connected(0, 2), components.connected(0, 4))  # True False
+    print(components.size(1), components.component_sizes())  # 3 [3, 2, 1]
@@ -1,43 +1,173 @@
+from csr_graph import CompiledGraph
 from hash_table import HashTable
+from map_file import read_map
+from union_find import UnionFind
+
+
+def parse_map(text):
+    # Blocks separated by a blank line, in the FRANCE.MAP format:
+    #   City      x    y
+    #   Neighbor  distance
+    #   ...
+    # Returns a list of (city, x, y, [(neighbor, distance), ...]); the lines
+    # are checked by map_file.read_map
+    return list(read_map(text.split('\n')))
+
 
 class WeightedGraph:
-    def __init__(self, capacity=100):
-        self.ht = HashTable(capacity)
+    def __init__(self, capacity=100, table_class=HashTable):
+        # Each vertex is stored as (x, y, [(neighbor, distance), ...]), in a
+        # table_class table (HashTable, or CuckooHashTable for lookups of
+        # bounded cost)
+        self.ht = table_class(capacity)
+        # Lower bound of the road distance per unit of map distance, used to
+        # keep the straight-line heuristic admissible. Up to consistent_scale
+        # the heuristic is also consistent (h(u) <= distance(u, v) + h(v) for
+        # every road), so A* never has to reopen a city. Both start at 1
+        # and are lowered by add_edge (see update_scale)
+        self.scale = 1
+        self.consistent_scale = 1
+        # Incremented by every change of the cities or roads, so that the
+        # data computed from the graph (see path_cache) knows it is outdated
+        self.version = 0
+        # Connectivity index: UnionFind of the cities (component_ids: city
+        # -> id in it), followed by add_vertex and add_edge; None when it has
+        # to be made again by update_components (after a load, or when
+        # add_vertex replaced a city and dropped its roads)
+        self.table_class = table_class
+        self.component_ids = table_class(capacity)
+        self.components = UnionFind()
+
+    @classmethod
+    def from_map(cls, text, table_class=HashTable):
+        return cls.from_cities(parse_map(text), table_class)
+
+    @classmethod
+    def from_cities(cls, cities, table_class=HashTable):
+        # cities: list of (city, x, y, [(neighbor, distance), ...]), as
+        # returned by parse_map
+        graph = cls(table_class=table_class)
+        graph.ht = table_class.from_items(((city, (x, y, edges)) for city, x, y, edges in cities),
+                                          expected_size=len(cities))
+        graph.components = None
+        # Neighbors without a block of their own have no coordinates
+        for _, _, _, edges in cities:
+            for neighbor, _ in edges:
+                if not graph.ht.contains(neighbor):
+                    graph.add_vertex(neighbor)
+        graph.update_scale()
+        graph.update_components()
+        return graph
 
-    def add_vertex(self, name):
-        self.ht.set(name, [])
+    def add_vertex(self, name, x=None, y=None):
+        replaced = self.ht.contains(name)
+        if replaced:
+            self.components = None
+        elif self.components is not None:
+            self.component_ids.set(name, self.components.add())
+        self.ht.set(name, (x, y, []))
+        if replaced:
+            # The roads into the city now start from other coordinates
+            self.update_scale()
+        self.version += 1
 
     def add_edge(self, from_vertex, to_vertex, distance):
-        if not self.ht.get(from_vertex):
-            self.ht.set(from_vertex, [])
-        if not self.ht.get(to_vertex):
-            self.ht.set(to_vertex, [])
-        self.ht.get(from_vertex).append((to_vertex, distance))
+        if not self.ht.contains(from_vertex):
+            self.add_vertex(from_vertex)
+        if not self.ht.contains(to_vertex):
+            self.add_vertex(to_vertex)
+        self.ht.get(from_vertex)[2].append((to_vertex, distance))
+        # A road shorter than the straight line allows lowers the scale, or
+        # the heuristic would overestimate, and the consistent scale, or a
+        # closed city could be reached again by a shorter path
+        ratio = self.edge_ratio(from_vertex, to_vertex, distance)
+        if ratio is not None:
+            self.scale = min(self.scale, ratio)
+            self.consistent_scale = min(self.consistent_scale, ratio)
+        if self.components is not None:
+            self.components.union(self.component_ids.get(from_vertex), self.component_ids.get(to_vertex))
+        self.version += 1
 
     def get_neighbors(self, vertex):
-        if self.ht.contains(vertex):
-            return self.ht.get(vertex)
-        else:
+        vertex_data = self.ht.get(vertex)
+        if vertex_data is None:
             return []
-    
+        return vertex_data[2]
+
     @property
     def vertices(self):
         return list(self.ht.keys())
-    
+
     def get_coordinates(self, node):
         vertex = self.ht.get(node)
-        if vertex is not None and len(vertex) >= 2:
+        if vertex is not None and vertex[0] is not None and vertex[1] is not None:
             return vertex[0], vertex[1]
         else:
             raise ValueError(f"Node {node} not found in graph or does not have valid coordinates")
-    
+
+    def edge_ratio(self, from_vertex, to_vertex, distance):
+        # Road distance / straight-line distance of a road, None when an end
+        # has no coordinates or both ends are at the same place
+        x1, y1, _ = self.ht.get(from_vertex)
+        x2, y2, _ = self.ht.get(to_vertex)
+        if x1 is None or x2 is None or (x1, y1) == (x2, y2):
+            return None
+        return distance / ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
+
+    def update_scale(self):
+        # Smallest ratio road distance / straight-line distance over all edges
+        scale = None
+        for name in self.ht.keys():
+            for neighbor, distance in self.ht.get(name)[2]:
+                ratio = self.edge_ratio(name, neighbor, distance)
+                if ratio is not None and (scale is None or ratio < scale):
+                    scale = ratio
+        self.scale = 1 if scale is None else scale
+        self.consistent_scale = self.scale
+
+    def update_components(self):
+        # Connectivity index of all the cities at once, in O(V + E alpha(V))
+        names = self.vertices
+        self.component_ids = self.table_class.from_items(((name, i) for i, name in enumerate(names)),
+                                                         expected_size=len(names))
+        self.components = UnionFind(len(names))
+        for i, name in enumerate(names):
+            neighbors = self.component_ids.get_many(neighbor for neighbor, _ in self.ht.get(name)[2])
+            for neighbor in neighbors:
+                self.components.union(i, neighbor)
+
+    def connected(self, from_vertex, to_vertex):
+        # False when there is no path between the two cities, in
+        # O(alpha(V)) (True does not promise a path when some roads only go
+        # one way)
+        if self.components is None:
+            self.update_components()
+        a = self.component_ids.get(from_vertex)
+        b = self.component_ids.get(to_vertex)
+        return a is not None and b is not None and self.components.connected(a, b)
+
+    def component_size(self, vertex):
+        # Number of cities in the component of a city (0 if unknown)
+        if self.components is None:
+            self.update_components()
+        i = self.component_ids.get(vertex)
+        return 0 if i is None else self.components.size(i)
+
+    def component_sizes(self):
+        if self.components is None:
+            self.update_components()
+        return self.components.component_sizes()
+
     def get_edge_distance(self, from_vertex, to_vertex):
-        neighbors = self.ht.get(from_vertex)
-        for neighbor in neighbors:
-            if neighbor[0] == to_vertex:
-                return neighbor[1]
+        for neighbor, distance in self.get_neighbors(from_vertex):
+            if neighbor == to_vertex:
+                return distance
         return None
-    
+
+    def compile(self):
+        # Frozen copy with dense integer ids and CSR arrays, see csr_graph
+        return CompiledGraph.from_graph(self)
+
     def display(self):
         for key in self.ht.keys():
-            print(f"{key} -> {self.ht.get(key)}")
\ No newline at end of file
+            print(f"{key} -> {self.ht.get(key)}")
@@ -0,0 +1,190 @@
+# ---------- Compact Hash Table using Linear Probing ----------
+# Description: Same interface and probing as HashTable, but without one
+# (key, value) tuple per slot.
+
+# structure: three parallel arrays of length m
+#            hashes: array('q') of the cached hash of each key
+#            keys:   list of keys (EMPTY or DELETED for free slots)
+#            values: list of values
+# Number of pairs: n
+# Capacity of the hash table: m (length of the arrays)
+
+from array import array
+
+from hash_table import DELETE, DELETED, GET, SET, HashTable
+
+EMPTY = object()
+
+
+class CompactHashTable(HashTable):
+    EMPTY = EMPTY
+
+    def __init__(self, capacity=10):
+        super().__init__(capacity)
+        self.table = None
+        self.hashes = array('q', bytes(8 * self.capacity))
+        self.keys_array = [EMPTY] * self.capacity
+        self.values_array = [None] * self.capacity
+
+    def __str__(self):
+        return f"CompactHashTable<{self.capacity}, {self.size}, {self.items()}>"
+
+    def keys(self):
+        return [key for key in self.keys_array if key is not EMPTY and key is not DELETED]
+
+    def values(self):
+        return [self.values_array[i] for i, key in enumerate(self.keys_array) if key is not EMPTY and key is not DELETED]
+
+    def items(self):
+        return [(key, self.values_array[i]) for i, key in enumerate(self.keys_array) if key is not EMPTY and key is not DELETED]
+
+    def get(self, key, default=None):
+        keys = self.keys_array
+        hashes = self.hashes
+        capacity = self.capacity
+        h = hash(key)
+        index = h % capacity
+        probes = 1
+        value = default
+        while True:
+            stored = keys[index]
+            if stored is EMPTY:
+                break
+            # Cheap integer comparison first, the key comparison only on a hash match
+            if stored is key or hashes[index] == h and stored is not DELETED and stored == key:
+                value = self.values_array[index]
+                break
+            index = (index + 1) % capacity
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(GET, probes)
+        return value
+
+    def set(self, key, value):
+        if self.load_factor() > self.max_load_factor:
+            if self.size / self.capacity > self.max_load_factor / 2:
+                self.grow()
+            else:
+                self.rehash(self.capacity)
+
+        h = hash(key)
+        index = h % self.capacity
+        tombstone = None
+        probes = 1
+        while True:
+            stored = self.keys_array[index]
+            if stored is EMPTY:
+                if tombstone is not None:
+                    index = tombstone
+                    self.deleted -= 1
+                self.hashes[index] = h
+                self.keys_array[index] = key
+                self.size += 1
+                break
+            if stored is DELETED:
+                if tombstone is None:
+                    tombstone = index
+            elif self.hashes[index] == h and (stored is key or stored == key):
+                break
+            index = (index + 1) % self.capacity
+            probes += 1
+
+        self.values_array[index] = value
+        if self.stats is not None:
+            self.stats.record(SET, probes)
+
+    def delete(self, key):
+        h = hash(key)
+        index = h % self.capacity
+        probes = 1
+        while True:
+            stored = self.keys_array[index]
+            if stored is EMPTY:
+                if self.stats is not None:
+                    self.stats.record(DELETE, probes)
+                return
+            if self.hashes[index] == h and stored is not DELETED and (stored is key or stored == key):
+                break
+            index = (index + 1) % self.capacity
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(DELETE, probes)
+        self.size -= 1
+        self.values_array[index] = None
+        if self.keys_array[(index + 1) % self.capacity] is EMPTY:
+            self.keys_array[index] = EMPTY
+            index = (index - 1) % self.capacity
+            while self.keys_array[index] is DELETED:
+                self.keys_array[index] = EMPTY
+                self.deleted -= 1
+                index = (index - 1) % self.capacity
+        else:
+            self.keys_array[index] = DELETED
+            self.deleted += 1
+
+        if self.capacity > self.min_capacity and self.size < self.capacity * self.min_load_factor:
+            self.shrink()
+        elif self.deleted > self.capacity * self.max_deleted_factor:
+            self.rehash(self.capacity)
+
+    def get_many(self, keys, default=None):
+        return [self.get(key, default) for key in keys]
+
+    def set_many(self, pairs):
+        if not isinstance(pairs, list):
+            pairs = list(pairs)
+        self.make_room(len(pairs))
+        for key, value in pairs:
+            self.set(key, value)
+
+    def longest_cluster(self):
+        longest = 0
+        run = 0
+        for key in self.keys_array + self.keys_array:
+            if key is EMPTY:
+                run = 0
+            else:
+                run += 1
+                longest = max(longest, run)
+        return min(longest, self.capacity)
+
+    def rebuild(self, capacity):
+        # The hashes are cached, so no key is hashed again here
+        old_hashes = self.hashes
+        old_keys = self.keys_array
+        old_values = self.values_array
+        self.capacity = capacity
+        self.hashes = array('q', bytes(8 * capacity))
+        self.keys_array = [EMPTY] * capacity
+        self.values_array = [None] * capacity
+        self.deleted = 0
+
+        for i, key in enumerate(old_keys):
+            if key is not EMPTY and key is not DELETED:
+                h = old_hashes[i]
+                index = h % capacity
+                while self.keys_array[index] is not EMPTY:
+                    index = (index + 1) % capacity
+                self.hashes[index] = h
+                self.keys_array[index] = key
+                self.values_array[index] = old_values[i]
+
+    def probe_lengths(self):
+        return [(index - self.hashes[index] % self.capacity) % self.capacity + 1
+                for index, key in enumerate(self.keys_array) if key is not EMPTY and key is not DELETED]
+
+    def display(self):
+        print(f"CompactHashTable[{', '.join(str(pair) for pair in self.items())}]")
+
+
+if __name__ == "__main__":
+    ht = CompactHashTable()
+    ht.set("hello", "world")
+    ht.set("foo", "bar")
+    ht.set("spam", "eggs")
+    ht.set("spam", "ham")
+    ht.delete("foo")
+
+    ht.display()  # CompactHashTable[('hello', 'world'), ('spam', 'ham')] in some order
@@ -0,0 +1,213 @@
+# ---------- Concurrent Hash Table using Linear Probing ----------
+# Description: Thread-safe hash table made of independent segments, each one
+# a linear probing HashTable with its own lock (lock striping): writers only
+# block the writers of the same segment.
+
+# structure: List of segments; a key always goes to the same segment
+# Number of pairs: n (sum of the segment sizes)
+# Capacity of the hash table: sum of the segment capacities
+#
+# Readers never take a lock. A segment never rebuilds its table in place:
+# grow(), shrink() and the tombstone clean-up fill a new list and publish it
+# with a single assignment, so a reader sees either the old table or the new
+# one, never a half-built one. Writes inside a table replace one slot at a
+# time, which is atomic for a list.
+#
+# Statistics (enable_stats) are kept per segment; a reader only takes the
+# lock of its segment to record its probes, and only while they are enabled.
+
+import threading
+
+from hash_table import DELETED, GET, HashTable
+
+
+class Segment(HashTable):
+    def __init__(self, capacity=10):
+        super().__init__(capacity)
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        # Lock-free: work on one snapshot of the table, and never move pairs
+        # around like HashTable.get does
+        table = self.table
+        capacity = len(table)
+        index = hash(key) % capacity
+        probes = 1
+        value = default
+        while True:
+            pair = table[index]
+            if pair is None:
+                break
+            if pair is not DELETED and pair[0] == key:
+                value = pair[1]
+                break
+            index = (index + 1) % capacity
+            probes += 1
+
+        stats = self.stats
+        if stats is not None:
+            with self.lock:
+                stats.record(GET, probes)
+        return value
+
+    def get_many(self, keys, default=None):
+        # Lock-free like get, on one snapshot for all the keys; the probes
+        # are recorded at the end, under a single lock
+        table = self.table
+        capacity = len(table)
+        values = []
+        probes = []
+        for key in keys:
+            index = hash(key) % capacity
+            count = 1
+            value = default
+            while True:
+                pair = table[index]
+                if pair is None:
+                    break
+                if pair is not DELETED and pair[0] == key:
+                    value = pair[1]
+                    break
+                index = (index + 1) % capacity
+                count += 1
+            values.append(value)
+            probes.append(count)
+
+        stats = self.stats
+        if stats is not None:
+            with self.lock:
+                for count in probes:
+                    stats.record(GET, count)
+        return values
+
+    def set(self, key, value):
+        with self.lock:
+            super().set(key, value)
+
+    def delete(self, key):
+        with self.lock:
+            super().delete(key)
+
+    def set_many(self, pairs):
+        with self.lock:
+            super().set_many(pairs)
+
+    def rebuild(self, capacity):
+        table = [None] * capacity
+        for pair in self.table:
+            if pair is not None and pair is not DELETED:
+                index = hash(pair[0]) % capacity
+                while table[index] is not None:
+                    index = (index + 1) % capacity
+                table[index] = pair
+        self.table = table
+        self.capacity = capacity
+        self.deleted = 0
+
+
+class ConcurrentHashTable:
+    def __init__(self, capacity=10, segments=16):
+        self.segments = [Segment(max(8, capacity // segments)) for _ in range(segments)]
+
+    def __str__(self):
+        return f"ConcurrentHashTable<{len(self.segments)}, {self.capacity}, {self.size}>"
+
+    def segment_index(self, key):
+        # Mix the hash first: the segment index must not follow the slot
+        # index inside the segment, or every segment would use a few slots
+        return (hash(key) * 2654435761 >> 16) % len(self.segments)
+
+    def segment(self, key):
+        return self.segments[self.segment_index(key)]
+
+    @property
+    def size(self):
+        return sum(segment.size for segment in self.segments)
+
+    @property
+    def capacity(self):
+        return sum(segment.capacity for segment in self.segments)
+
+    def contains(self, key):
+        return self.get(key, DELETED) is not DELETED
+
+    def get(self, key, default=None):
+        return self.segment(key).get(key, default)
+
+    def set(self, key, value):
+        self.segment(key).set(key, value)
+
+    def delete(self, key):
+        self.segment(key).delete(key)
+
+    def group(self, items, key_of):
+        # items split by segment: list of (segment, positions in items,
+        # items of the segment), in the order of items
+        groups = [None] * len(self.segments)
+        for position, item in enumerate(items):
+            index = self.segment_index(key_of(item))
+            if groups[index] is None:
+                groups[index] = (self.segments[index], [], [])
+            groups[index][1].append(position)
+            groups[index][2].append(item)
+        return [group for group in groups if group is not None]
+
+    def get_many(self, keys, default=None):
+        # Values of several keys, as a list: one get_many per segment
+        if not isinstance(keys, list):
+            keys = list(keys)
+        values = [default] * len(keys)
+        for segment, positions, segment_keys in self.group(keys, lambda key: key):
+            for position, value in zip(positions, segment.get_many(segment_keys, default)):
+                values[position] = value
+        return values
+
+    def set_many(self, pairs):
+        # Same as set for every pair in order: a key always goes to the same
+        # segment, so the last value of a key still wins. Each segment is
+        # locked once for all its pairs
+        if not isinstance(pairs, list):
+            pairs = list(pairs)
+        for segment, _, segment_pairs in self.group(pairs, lambda pair: pair[0]):
+            segment.set_many(segment_pairs)
+
+    def enable_stats(self):
+        # List of the statistics of every segment
+        return [segment.enable_stats() for segment in self.segments]
+
+    def disable_stats(self):
+        for segment in self.segments:
+            segment.disable_stats()
+
+    def keys(self):
+        return [key for segment in self.segments for key in segment.keys()]
+
+    def values(self):
+        return [value for segment in self.segments for value in segment.values()]
+
+    def items(self):
+        return [pair for segment in self.segments for pair in segment.items()]
+
+    def display(self):
+        print(f"ConcurrentHashTable[{', '.join(str(pair) for pair in self.items())}]")
+
+
+if __name__ == "__main__":
+    ht = ConcurrentHashTable()
+
+    def worker(first):
+        for i in range(first, first + 1000):
+            ht.set(i, i * i)
+
+    threads = [threading.Thread(target=worker, args=(i * 1000,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(ht)  # 8000 pairs
+    print(ht.get(4321))  # 18671041
+
+    stats = ht.enable_stats()
+    print(ht.get_many([4321, 8000, 7]))  # [18671041, None, 49]
+    print(sum(segment.counts[0] for segment in stats))  # 3 gets recorded
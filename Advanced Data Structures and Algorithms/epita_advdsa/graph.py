@@ -1,50 +1,190 @@
+from collections import deque
+
 from hash_table import *
 
 class Graph:
-    def __init__(self, directional=False, capacity=100):
+    def __init__(self, directional=False, capacity=100, table_class=HashTable):
         self.directional = directional
-        self.ht = HashTable(capacity)
+        # table_class: HashTable, or CuckooHashTable for lookups of bounded
+        # cost; also used for the ids of index()
+        self.table_class = table_class
+        self.ht = table_class(capacity)
+        # Dense ids of the nodes, made by the first index() and then kept up
+        # to date by add_vertex and add_edge
+        self.names = None
+        self.ids = None
+        self.adjacency = None
     
     def __str__(self):
         return f"#Graph<{self.directional}_{self.capacity}>"
     
     def add_vertex(self, key):
         self.ht.set(key, [])
+        if self.ids is not None:
+            self.adjacency[self.vertex_id(key)] = []
     
     def add_edge(self, key1, key2):
         self.ht.get(key1).append(key2)
         if not self.directional:
             self.ht.get(key2).append(key1)
+        if self.ids is not None:
+            vertex1 = self.vertex_id(key1)
+            vertex2 = self.vertex_id(key2)
+            self.adjacency[vertex1].append(vertex2)
+            if not self.directional:
+                self.adjacency[vertex2].append(vertex1)
+
+    def vertex_id(self, key):
+        # Dense id of a node once the index is made, the next free one for a
+        # new node (in O(1), the index is never made again)
+        vertex = self.ids.get(key)
+        if vertex is None:
+            vertex = len(self.names)
+            self.names.append(key)
+            self.ids.set(key, vertex)
+            self.adjacency.append([])
+        return vertex
     
     def display(self):
         for key in self.ht.keys():
             print(f"{key} -> {self.ht.get(key)}")
-            
+
+    def index(self):
+        # Gives every node a dense id 0 .. V - 1 (names: id -> node, ids:
+        # HashTable node -> id) and stores the adjacency lists as lists of
+        # ids, so that the traversals mark nodes in a bytearray instead of
+        # hashing them. Made on the first call only: add_vertex and add_edge
+        # then update it
+        if self.ids is None:
+            names = list(self.ht.keys())
+            ids = self.table_class.from_items(((name, i) for i, name in enumerate(names)), expected_size=len(names))
+            adjacency = []
+            for name in list(names):
+                neighbors = self.ht.get(name)
+                found = ids.get_many(neighbors)
+                if None in found:
+                    # Target of a directed edge that was never added
+                    for j, neighbor in enumerate(neighbors):
+                        if found[j] is None:
+                            found[j] = ids.get(neighbor)
+                        if found[j] is None:
+                            found[j] = len(names)
+                            names.append(neighbor)
+                            ids.set(neighbor, found[j])
+                adjacency.append(found)
+            adjacency += [[] for _ in range(len(names) - len(adjacency))]
+            self.names, self.ids, self.adjacency = names, ids, adjacency
+        return self.names, self.ids, self.adjacency
+
+    def visited_buffer(self):
+        # Zeroed bytearray, 1 byte per node, that the traversals can be given
+        # instead of allocating their own; they leave it zeroed again (also
+        # when stopped early), so one buffer serves any number of queries.
+        # The traversals make it longer when nodes were added since
+        return bytearray(len(self.index()[0]))
+
+    def breadth_first(self, start, max_depth=None, visited=None):
+        # Generator of (node, depth, parent) in breadth-first order, parent
+        # None for start. Nothing is computed before it is asked for, so a
+        # loop can stop as soon as it found what it looks for. The nodes
+        # deeper than max_depth are not visited
+        names, ids, adjacency = self.index()
+        first = ids.get(start)
+        if first is None:
+            return
+        reused = visited is not None
+        if not reused:
+            visited = bytearray(len(names))
+        elif len(visited) < len(names):
+            visited.extend(bytes(len(names) - len(visited)))
+        visited[first] = 1
+        queue = deque([(first, 0)])
+        marked = [first] if reused else None
+        try:
+            yield start, 0, None
+            while queue:
+                m, depth = queue.popleft()
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for neighbor in adjacency[m]:
+                    if not visited[neighbor]:
+                        visited[neighbor] = 1
+                        if reused:
+                            marked.append(neighbor)
+                        queue.append((neighbor, depth + 1))
+                        yield names[neighbor], depth + 1, names[m]
+        finally:
+            if reused:
+                for vertex in marked:
+                    visited[vertex] = 0
+
+    def depth_first(self, start, max_depth=None, visited=None):
+        # Generator of (node, depth, parent) in the order of
+        # depth_first_search (a node is marked when pushed, the last pushed
+        # is visited first); depth is the depth in that search tree
+        names, ids, adjacency = self.index()
+        first = ids.get(start)
+        if first is None:
+            return
+        reused = visited is not None
+        if not reused:
+            visited = bytearray(len(names))
+        elif len(visited) < len(names):
+            visited.extend(bytes(len(names) - len(visited)))
+        visited[first] = 1
+        stack = [(first, 0, -1)]
+        marked = [first] if reused else None
+        try:
+            while stack:
+                m, depth, parent = stack.pop()
+                yield names[m], depth, None if parent == -1 else names[parent]
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for neighbor in adjacency[m]:
+                    if not visited[neighbor]:
+                        visited[neighbor] = 1
+                        if reused:
+                            marked.append(neighbor)
+                        stack.append((neighbor, depth + 1, m))
+        finally:
+            if reused:
+                for vertex in marked:
+                    visited[vertex] = 0
+
+    def connected_components(self):
+        # Lists of the nodes of each connected component (for a directed
+        # graph, the edges are followed both ways: weakly connected)
+        names, _, adjacency = self.index()
+        if self.directional:
+            both_ways = [list(neighbors) for neighbors in adjacency]
+            for vertex, neighbors in enumerate(adjacency):
+                for neighbor in neighbors:
+                    both_ways[neighbor].append(vertex)
+            adjacency = both_ways
+        visited = bytearray(len(names))
+        components = []
+        for first in range(len(names)):
+            if visited[first]:
+                continue
+            visited[first] = 1
+            component = [first]
+            head = 0
+            while head < len(component):
+                for neighbor in adjacency[component[head]]:
+                    if not visited[neighbor]:
+                        visited[neighbor] = 1
+                        component.append(neighbor)
+                head += 1
+            components.append([names[vertex] for vertex in component])
+        return components
+
     def breadth_first_search(self, start):
-        queue = []
-        visited = []
-        queue.append(start)
-        visited.append(start)
-        while len(queue) > 0:
-            m = queue.pop(0)
+        for m, _, _ in self.breadth_first(start):
             print(m)
-            for neighbor in self.ht.get(m):
-                if neighbor not in visited:
-                    queue.append(neighbor)
-                    visited.append(neighbor)
-                    
+
     def depth_first_search(self, start):
-        stack = []
-        visited = []
-        stack.append(start)
-        visited.append(start)
-        while len(stack) > 0:
-            m = stack.pop()
+        for m, _, _ in self.depth_first(start):
             print(m)
-            for neighbor in self.ht.get(m):
-                if neighbor not in visited:
-                    stack.append(neighbor)
-                    visited.append(neighbor)
 
 if __name__ == '__main__':
     g = Graph()
@@ -57,4 +197,19 @@ if __name__ == '__main__':
     g.add_edge('A', 'C')
     g.add_edge('C', 'D')
     g.add_edge('C', 'B')
-    g.display()
\ No newline at end of file
+    g.display()
+
+    g.breadth_first_search('A')  # A B C D
+    for node, depth, parent in g.breadth_first('A'):
+        print(node, depth, parent)  # A 0 None, B 1 A, C 1 A
+        if node == 'C':
+            break  # D is never visited
+    print([node for node, _, _ in g.depth_first('A')])  # ['A', 'C', 'D', 'B']
+
+    # One buffer for many traversals
+    visited = g.visited_buffer()
+    for start in ('A', 'D'):
+        print([node for node, _, _ in g.breadth_first(start, visited=visited)])
+
+    g.add_vertex('E')
+    print(g.connected_components())  # [['B', 'A', 'C', 'D'], ['E']] (any order)
\ No newline at end of file
@@ -1,24 +1,124 @@
 # ---------- Hash Table using Linear Probing ----------
 # Description: This program implements a hash table using linear probing.
+# Quadratic probing and double hashing can be chosen with the probing
+# argument, and make_hash_table() also offers Robin Hood hashing.
 
 # structure: List of (key, value) pairs
 # Number of pairs: n
 # Capacity of the hash table: m (length of the list)
 
+import time
+
 DELETED = object()
 
+PROBING = ('linear', 'quadratic', 'double', 'robin_hood')
+# The ones HashTable itself implements; Robin Hood hashing is
+# RobinHoodHashTable (make_hash_table() picks the class)
+HASH_TABLE_PROBING = PROBING[:3]
+
+# Smallest capacity: the load factor is checked before an insertion, so a
+# table of 1 or 2 slots could get all of them used, and a lookup of a
+# missing key would then never reach an empty slot
+MIN_CAPACITY = 4
+
+# Operations counted by HashTableStats
+GET, SET, DELETE = 0, 1, 2
+OPERATIONS = ('get', 'set', 'delete')
+
+
+# ---------- Hash Table statistics ----------
+# Description: Opt-in counters of a hash table, see HashTable.enable_stats().
+# Probe counts are kept as histograms: histograms[operation][p] is the number
+# of operations that looked at p slots.
+
+
+class HashTableStats:
+    def __init__(self):
+        self.counts = [0, 0, 0]
+        self.probes = [0, 0, 0]
+        self.histograms = [[], [], []]
+        self.grows = 0
+        self.shrinks = 0
+        self.rehashes = 0
+        self.rehash_time = 0.0
+
+    def __str__(self):
+        return f"HashTableStats<{self.counts}, {self.probes}, {self.grows}, {self.shrinks}, {self.rehashes}>"
+
+    def record(self, operation, probes):
+        self.counts[operation] += 1
+        self.probes[operation] += probes
+        histogram = self.histograms[operation]
+        while len(histogram) <= probes:
+            histogram.append(0)
+        histogram[probes] += 1
+
+    def record_rehash(self, old_capacity, new_capacity, seconds):
+        if new_capacity > old_capacity:
+            self.grows += 1
+        elif new_capacity < old_capacity:
+            self.shrinks += 1
+        else:
+            self.rehashes += 1
+        self.rehash_time += seconds
+
+    def average_probes(self, operation):
+        if self.counts[operation] == 0:
+            return 0
+        return self.probes[operation] / self.counts[operation]
+
+    def max_probes(self, operation):
+        return len(self.histograms[operation]) - 1 if self.histograms[operation] else 0
+
+    def reset(self):
+        self.__init__()
+
+    def export_histograms(self):
+        # CSV lines "operation,probes,count", one per non-empty bucket
+        lines = ["operation,probes,count"]
+        for operation, name in enumerate(OPERATIONS):
+            for probes, count in enumerate(self.histograms[operation]):
+                if count:
+                    lines.append(f"{name},{probes},{count}")
+        return "\n".join(lines)
+
+    def report(self, ht):
+        # Counters of this object together with the current shape of the table
+        lines = [f"capacity: {ht.capacity}, size: {ht.size}, load factor: {ht.load_factor():.3f}",
+                 f"tombstone ratio: {ht.tombstone_ratio():.3f}, longest cluster: {ht.longest_cluster()}"]
+        for operation, name in enumerate(OPERATIONS):
+            lines.append(f"{name}: {self.counts[operation]} calls, "
+                         f"{self.average_probes(operation):.3f} probes on average, {self.max_probes(operation)} at most")
+        lines.append(f"grows: {self.grows}, shrinks: {self.shrinks}, rehashes: {self.rehashes}, "
+                     f"rehash time: {self.rehash_time:.6f} s")
+        return "\n".join(lines)
+
 
 class HashTable:
     DELETED = DELETED
 
-    def __init__(self, capacity=10):
+    def __init__(self, capacity=10, probing='linear'):
+        if probing not in HASH_TABLE_PROBING:
+            if probing in PROBING:
+                raise ValueError(f"Use make_hash_table(capacity, '{probing}') for {probing} probing")
+            raise ValueError(f"Unknown probing strategy: {probing}")
+        capacity = max(capacity, MIN_CAPACITY)
+        if probing != 'linear':
+            # Quadratic (triangular) steps and odd double hashing steps only
+            # visit every slot when the capacity is a power of 2
+            capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.probing = probing
         self.size = 0
         self.capacity = capacity
         self.table = [None] * capacity
         self.deleted = 0
         self.max_load_factor = 0.5
-        self.keys_list = []
-        self.values_list = []
+        # Shrink when less than 1/8 of the slots are used, never below the
+        # initial capacity, and purge the tombstones once they fill 1/4 of it
+        self.min_load_factor = 0.125
+        self.max_deleted_factor = 0.25
+        self.min_capacity = capacity
+        self.stats = None
 
     def __str__(self):
         return f"HashTable<{self.capacity}, {self.size}, {self.table}>"
@@ -26,80 +126,589 @@ class HashTable:
     def load_factor(self):
         return (self.size + self.deleted) / self.capacity
 
+    def tombstone_ratio(self):
+        return self.deleted / self.capacity
+
+    def longest_cluster(self):
+        # Longest run of used slots (pairs or tombstones), wrapping around
+        longest = 0
+        run = 0
+        for slot in self.table + self.table:
+            if slot is None:
+                run = 0
+            else:
+                run += 1
+                longest = max(longest, run)
+        return min(longest, self.capacity)
+
+    def enable_stats(self):
+        if self.stats is None:
+            self.stats = HashTableStats()
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+
+    def probe_step(self, h):
+        # First step of the probe sequence of a hash, and how much the step
+        # grows after each probe
+        if self.probing == 'linear':
+            return 1, 0
+        if self.probing == 'quadratic':
+            return 1, 1
+        return (h // self.capacity) % self.capacity | 1, 0
+
+    def contains(self, key):
+        return self.get(key, DELETED) is not DELETED
+
     def keys(self):
-        return [pair[0] for pair in self.table if pair is not None]
+        return [pair[0] for pair in self.table if pair is not None and pair is not DELETED]
 
     def values(self):
-        return [pair[1] for pair in self.table if pair is not None]
+        return [pair[1] for pair in self.table if pair is not None and pair is not DELETED]
 
-    def get(self, key):
-        index = hash(key) % self.capacity
+    def items(self):
+        return [pair for pair in self.table if pair is not None and pair is not DELETED]
+
+    def get(self, key, default=None):
+        h = hash(key)
+        index = h % self.capacity
+        step, increment = self.probe_step(h)
+        tombstone = None
+        probes = 1
+        value = default
         while True:
-            if self.table[index] is None:
-                return None
-            if self.table[index] is DELETED or self.table[index][0] != key:
-                index = (index + 1) % self.capacity
-            if self.table[index] is not None and self.table[index][0] == key:
-                return self.table[index][1]
+            pair = self.table[index]
+            if pair is None:
+                break
+            if pair is DELETED:
+                if tombstone is None:
+                    tombstone = index
+            elif pair[0] == key:
+                # Move the pair into the first tombstone of its probe sequence,
+                # so the next lookup for this key is shorter
+                if tombstone is not None:
+                    self.table[tombstone] = pair
+                    self.table[index] = DELETED
+                value = pair[1]
+                break
+            index = (index + step) % self.capacity
+            step += increment
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(GET, probes)
+        return value
 
     def set(self, key, value):
         if self.load_factor() > self.max_load_factor:
-            self.grow()
+            if self.size / self.capacity > self.max_load_factor / 2:
+                self.grow()
+            else:
+                # Mostly tombstones: clean them up instead of doubling the table
+                self.rehash(self.capacity)
 
-        index = hash(key) % self.capacity
+        h = hash(key)
+        index = h % self.capacity
+        step, increment = self.probe_step(h)
+        tombstone = None
+        probes = 1
         while True:
-            if self.table[index] is None or self.table[index] is DELETED:
-                self.table[index] = (key, value)
+            pair = self.table[index]
+            if pair is None:
+                if tombstone is not None:
+                    index = tombstone
+                    self.deleted -= 1
                 self.size += 1
-                self.keys_list.append(key)
-                self.values_list.append(value)
-                return
-            if self.table[index][0] == key:
-                self.table[index] = (key, value)
-                self.values_list[self.keys_list.index(key)] = value
-                return
-            index = (index + 1) % self.capacity
+                break
+            if pair is DELETED:
+                if tombstone is None:
+                    tombstone = index
+            elif pair[0] == key:
+                break
+            index = (index + step) % self.capacity
+            step += increment
+            probes += 1
+
+        self.table[index] = (key, value)
+        if self.stats is not None:
+            self.stats.record(SET, probes)
 
     def delete(self, key):
-        index = hash(key) % self.capacity
+        h = hash(key)
+        index = h % self.capacity
+        step, increment = self.probe_step(h)
+        probes = 1
         while True:
-            if self.table[index] is None:
-                return
-            if self.table[index] is DELETED or self.table[index][0] != key:
-                index = (index + 1) % self.capacity
-            if self.table[index][0] == key:
-                self.table[index] = DELETED
-                self.size -= 1
-                self.deleted += 1
-                return
-            if self.table[index][0] == key:
-                self.table[index] = DELETED
-                self.size -= 1
-                self.deleted += 1
-                key_index = self.keys_list.index(key)
-                del self.keys_list[key_index]
-                del self.values_list[key_index]
+            pair = self.table[index]
+            if pair is None:
+                if self.stats is not None:
+                    self.stats.record(DELETE, probes)
                 return
+            if pair is not DELETED and pair[0] == key:
+                break
+            index = (index + step) % self.capacity
+            step += increment
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(DELETE, probes)
+        self.size -= 1
+
+        if self.probing == 'linear' and self.table[(index + 1) % self.capacity] is None:
+            # End of a cluster: no tombstone needed, and the tombstones just
+            # before this slot are not needed anymore either
+            self.table[index] = None
+            index = (index - 1) % self.capacity
+            while self.table[index] is DELETED:
+                self.table[index] = None
+                self.deleted -= 1
+                index = (index - 1) % self.capacity
+        else:
+            self.table[index] = DELETED
+            self.deleted += 1
+
+        if self.capacity > self.min_capacity and self.size < self.capacity * self.min_load_factor:
+            self.shrink()
+        elif self.deleted > self.capacity * self.max_deleted_factor:
+            self.rehash(self.capacity)
+
+    def get_many(self, keys, default=None):
+        # Values of several keys (default for the missing ones), as a list.
+        # Same probing as get, without a method call per key
+        table = self.table
+        capacity = len(table)
+        linear = self.probing == 'linear'
+        stats = self.stats
+        values = []
+        for key in keys:
+            h = hash(key)
+            index = h % capacity
+            step, increment = (1, 0) if linear else self.probe_step(h)
+            value = default
+            probes = 1
+            while True:
+                pair = table[index]
+                if pair is None:
+                    break
+                if pair is not DELETED and pair[0] == key:
+                    value = pair[1]
+                    break
+                index = (index + step) % capacity
+                step += increment
+                probes += 1
+            values.append(value)
+            if stats is not None:
+                stats.record(GET, probes)
+        return values
+
+    def set_many(self, pairs):
+        # Same as calling set for every (key, value) pair, in order, but the
+        # table grows at most once, before the first pair
+        if not isinstance(pairs, list):
+            pairs = list(pairs)
+        self.make_room(len(pairs))
+
+        table = self.table
+        capacity = self.capacity
+        linear = self.probing == 'linear'
+        stats = self.stats
+        for key, value in pairs:
+            h = hash(key)
+            index = h % capacity
+            step, increment = (1, 0) if linear else self.probe_step(h)
+            tombstone = None
+            probes = 1
+            while True:
+                pair = table[index]
+                if pair is None:
+                    if tombstone is not None:
+                        index = tombstone
+                        self.deleted -= 1
+                    self.size += 1
+                    break
+                if pair is DELETED:
+                    if tombstone is None:
+                        tombstone = index
+                elif pair[0] == key:
+                    break
+                index = (index + step) % capacity
+                step += increment
+                probes += 1
+            table[index] = (key, value)
+            if stats is not None:
+                stats.record(SET, probes)
 
     def grow(self, factor=2):
+        self.rehash(self.capacity * factor)
+
+    def shrink(self, factor=2):
+        self.rehash(max(self.min_capacity, self.capacity // factor))
+
+    def capacity_for(self, n):
+        # Smallest capacity holding n pairs under the maximum load factor
+        capacity = int(n / self.max_load_factor) + 1
+        if self.probing in ('quadratic', 'double'):
+            capacity = 1 << (capacity - 1).bit_length()
+        return capacity
+
+    def make_room(self, n):
+        # Grow at most once so that n more pairs fit, and at least double
+        # like grow() does, so that many small batches stay linear
+        capacity = self.capacity_for(self.size + self.deleted + n)
+        if capacity > self.capacity:
+            self.rehash(max(capacity, self.capacity * 2))
+
+    def reserve(self, n):
+        # Make room for n pairs at once, so the next n sets never grow the
+        # table; the table will not shrink below that capacity either
+        capacity = self.capacity_for(n)
+        self.min_capacity = max(self.min_capacity, capacity)
+        if capacity > self.capacity:
+            self.rehash(capacity)
+
+    @classmethod
+    def from_items(cls, items, expected_size=None, **options):
+        # New table holding the (key, value) pairs of items, sized once from
+        # expected_size (or from len(items)) and filled in a single pass
+        if expected_size is None:
+            if not hasattr(items, '__len__'):
+                items = list(items)
+            expected_size = len(items)
+        ht = cls(**options)
+        ht.reserve(expected_size)
+        for key, value in items:
+            ht.set(key, value)
+        return ht
+
+    def rehash(self, capacity):
+        # Rebuild the table with the given capacity, dropping every tombstone
+        if self.stats is None:
+            self.rebuild(capacity)
+            return
         old_capacity = self.capacity
-        self.capacity *= factor
+        start = time.perf_counter()
+        self.rebuild(capacity)
+        self.stats.record_rehash(old_capacity, capacity, time.perf_counter() - start)
+
+    def rebuild(self, capacity):
         old_table = self.table
+        self.capacity = capacity
         self.table = [None] * self.capacity
+        self.deleted = 0
 
         for pair in old_table:
             if pair is not None and pair is not DELETED:
-                key, value = pair
-                index = hash(key) % self.capacity
-                while self.table[index] is not None and self.table[index] is not DELETED:
-                    index = (index + 1) % self.capacity
-                self.table[index] = (key, value)
+                h = hash(pair[0])
+                index = h % self.capacity
+                step, increment = self.probe_step(h)
+                while self.table[index] is not None:
+                    index = (index + step) % self.capacity
+                    step += increment
+                self.table[index] = pair
+
+    def probe_lengths(self):
+        # Number of slots a successful get has to look at, for every key
+        lengths = []
+        for slot, pair in enumerate(self.table):
+            if pair is not None and pair is not DELETED:
+                h = hash(pair[0])
+                index = h % self.capacity
+                step, increment = self.probe_step(h)
+                length = 1
+                while index != slot:
+                    index = (index + step) % self.capacity
+                    step += increment
+                    length += 1
+                lengths.append(length)
+        return lengths
+
+    def average_probe_length(self):
+        lengths = self.probe_lengths()
+        return sum(lengths) / len(lengths) if lengths else 0
+
+    def max_probe_length(self):
+        return max(self.probe_lengths(), default=0)
 
     def display(self):
         elements = [str(self.table[i]) for i in range(self.capacity) if self.table[i] and self.table[i] is not DELETED]
         print(f"HashTable[{', '.join(elements)}]")
 
 
+# ---------- Ordered Hash Table ----------
+# Description: Same interface as HashTable, but keys(), values() and items()
+# follow the insertion order, like the python dict layout.
+
+# structure: dense list of (key, value) pairs in insertion order (entries),
+#            and a sparse list of positions in entries (the hash table itself)
+# Number of pairs: n
+# Capacity of the hash table: m (length of the sparse list)
+
+
+class OrderedHashTable(HashTable):
+    def __init__(self, capacity=10):
+        super().__init__(capacity)
+        self.entries = []
+
+    def __str__(self):
+        return f"OrderedHashTable<{self.capacity}, {self.size}, {self.items()}>"
+
+    def keys(self):
+        return [entry[0] for entry in self.entries if entry is not None]
+
+    def values(self):
+        return [entry[1] for entry in self.entries if entry is not None]
+
+    def items(self):
+        return [entry for entry in self.entries if entry is not None]
+
+    def get(self, key, default=None):
+        index = hash(key) % self.capacity
+        probes = 1
+        value = default
+        while True:
+            position = self.table[index]
+            if position is None:
+                break
+            if position is not DELETED:
+                entry = self.entries[position]
+                if entry[0] == key:
+                    value = entry[1]
+                    break
+            index = (index + 1) % self.capacity
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(GET, probes)
+        return value
+
+    def set(self, key, value):
+        if self.load_factor() > self.max_load_factor:
+            if self.size / self.capacity > self.max_load_factor / 2:
+                self.grow()
+            else:
+                self.rehash(self.capacity)
+
+        index = hash(key) % self.capacity
+        tombstone = None
+        probes = 1
+        while True:
+            position = self.table[index]
+            if position is None:
+                if tombstone is not None:
+                    index = tombstone
+                    self.deleted -= 1
+                self.table[index] = len(self.entries)
+                self.entries.append((key, value))
+                self.size += 1
+                break
+            if position is DELETED:
+                if tombstone is None:
+                    tombstone = index
+            elif self.entries[position][0] == key:
+                # Overwriting keeps the original insertion position
+                self.entries[position] = (key, value)
+                break
+            index = (index + 1) % self.capacity
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(SET, probes)
+
+    def delete(self, key):
+        index = hash(key) % self.capacity
+        probes = 1
+        while True:
+            position = self.table[index]
+            if position is None:
+                if self.stats is not None:
+                    self.stats.record(DELETE, probes)
+                return
+            if position is not DELETED and self.entries[position][0] == key:
+                break
+            index = (index + 1) % self.capacity
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(DELETE, probes)
+        self.entries[position] = None
+        self.table[index] = DELETED
+        self.size -= 1
+        self.deleted += 1
+
+        if self.capacity > self.min_capacity and self.size < self.capacity * self.min_load_factor:
+            self.shrink()
+        elif self.deleted > self.capacity * self.max_deleted_factor or len(self.entries) > 2 * self.size + 8:
+            # Also compacts the entries once half of them are holes
+            self.rehash(self.capacity)
+
+    def get_many(self, keys, default=None):
+        return [self.get(key, default) for key in keys]
+
+    def set_many(self, pairs):
+        # In order, so that the keys keep the order of pairs
+        if not isinstance(pairs, list):
+            pairs = list(pairs)
+        self.make_room(len(pairs))
+        for key, value in pairs:
+            self.set(key, value)
+
+    def rebuild(self, capacity):
+        self.entries = self.items()
+        self.capacity = capacity
+        self.table = [None] * self.capacity
+        self.deleted = 0
+
+        for position, entry in enumerate(self.entries):
+            index = hash(entry[0]) % self.capacity
+            while self.table[index] is not None:
+                index = (index + 1) % self.capacity
+            self.table[index] = position
+
+    def probe_lengths(self):
+        return [(index - hash(self.entries[position][0]) % self.capacity) % self.capacity + 1
+                for index, position in enumerate(self.table) if position is not None and position is not DELETED]
+
+    def display(self):
+        print(f"OrderedHashTable[{', '.join(str(entry) for entry in self.items())}]")
+
+
+# ---------- Robin Hood Hash Table ----------
+# Description: Linear probing where a new pair takes the slot of any pair
+# closer to its home slot than the new pair is to its own ("steal from the
+# rich"), so probe lengths stay short and even. A delete shifts the rest of
+# the cluster back by one slot, so no DELETED tombstone is ever needed.
+
+# structure: List of (key, value) pairs, and the list of the distance from
+#            each pair to its home slot (distances)
+# Number of pairs: n
+# Capacity of the hash table: m (length of the lists)
+
+
+class RobinHoodHashTable(HashTable):
+    def __init__(self, capacity=10):
+        super().__init__(capacity)
+        self.probing = 'robin_hood'
+        self.distances = [0] * self.capacity
+
+    def get(self, key, default=None):
+        index = hash(key) % self.capacity
+        distance = 0
+        value = default
+        while True:
+            pair = self.table[index]
+            # A pair closer to its home than we are to ours means the key
+            # would have been placed before it
+            if pair is None or self.distances[index] < distance:
+                break
+            if pair[0] == key:
+                value = pair[1]
+                break
+            index = (index + 1) % self.capacity
+            distance += 1
+
+        if self.stats is not None:
+            self.stats.record(GET, distance + 1)
+        return value
+
+    def set(self, key, value):
+        if self.load_factor() > self.max_load_factor:
+            self.grow()
+
+        index = hash(key) % self.capacity
+        distance = 0
+        pair = (key, value)
+        swapped = False
+        probes = 1
+        while True:
+            current = self.table[index]
+            if current is None:
+                self.table[index] = pair
+                self.distances[index] = distance
+                self.size += 1
+                break
+            # Once a pair has been moved out, the key cannot be further away
+            if not swapped and current[0] == key:
+                self.table[index] = pair
+                break
+            if self.distances[index] < distance:
+                self.table[index], pair = pair, current
+                self.distances[index], distance = distance, self.distances[index]
+                swapped = True
+            index = (index + 1) % self.capacity
+            distance += 1
+            probes += 1
+
+        if self.stats is not None:
+            self.stats.record(SET, probes)
+
+    def delete(self, key):
+        index = hash(key) % self.capacity
+        distance = 0
+        while True:
+            pair = self.table[index]
+            if pair is None or self.distances[index] < distance:
+                if self.stats is not None:
+                    self.stats.record(DELETE, distance + 1)
+                return
+            if pair[0] == key:
+                break
+            index = (index + 1) % self.capacity
+            distance += 1
+
+        if self.stats is not None:
+            self.stats.record(DELETE, distance + 1)
+        # Backward shift: pull back every following pair of the cluster that
+        # is not already in its home slot
+        following = (index + 1) % self.capacity
+        while self.table[following] is not None and self.distances[following] > 0:
+            self.table[index] = self.table[following]
+            self.distances[index] = self.distances[following] - 1
+            index = following
+            following = (following + 1) % self.capacity
+        self.table[index] = None
+        self.distances[index] = 0
+        self.size -= 1
+
+        if self.capacity > self.min_capacity and self.size < self.capacity * self.min_load_factor:
+            self.shrink()
+
+    def get_many(self, keys, default=None):
+        return [self.get(key, default) for key in keys]
+
+    def set_many(self, pairs):
+        if not isinstance(pairs, list):
+            pairs = list(pairs)
+        self.make_room(len(pairs))
+        for key, value in pairs:
+            self.set(key, value)
+
+    def rebuild(self, capacity):
+        old_table = self.table
+        self.capacity = capacity
+        self.table = [None] * capacity
+        self.distances = [0] * capacity
+        self.size = 0
+
+        # The pairs moved here are not counted as set operations
+        stats = self.stats
+        self.stats = None
+        for pair in old_table:
+            if pair is not None:
+                self.set(pair[0], pair[1])
+        self.stats = stats
+
+    def probe_lengths(self):
+        return [self.distances[index] + 1 for index, pair in enumerate(self.table) if pair is not None]
+
+
+def make_hash_table(capacity=10, probing='linear'):
+    # Hash table with the given probing strategy (one of PROBING)
+    if probing == 'robin_hood':
+        return RobinHoodHashTable(capacity)
+    return HashTable(capacity, probing)
+
+
 if __name__ == "__main__":
     ht = HashTable(10000)
 
@@ -0,0 +1,255 @@
+# ---------- Hash Table benchmarks ----------
+# Description: Benchmarks for the hash tables of this package.
+# Usage: python hash_table_benchmark.py churn [operations] [live keys]
+#        python hash_table_benchmark.py compact [keys]
+#        python hash_table_benchmark.py probing [keys]
+#        python hash_table_benchmark.py concurrent [threads] [operations per thread]
+#        python hash_table_benchmark.py batch [keys]
+#        python hash_table_benchmark.py cuckoo [keys]
+
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from compact_hash_table import CompactHashTable
+from concurrent_hash_table import ConcurrentHashTable
+from cuckoo_hash_table import CuckooHashTable
+from hash_table import GET, PROBING, HashTable, make_hash_table
+
+
+def churn(operations=10_000_000, live=10_000):
+    # Mixed insert / delete / get workload where the number of live keys
+    # stays constant: the capacity and the probe length should stay flat too
+    ht = HashTable()
+    keys = []
+    for _ in range(live):
+        key = random.getrandbits(62)
+        ht.set(key, key)
+        keys.append(key)
+    stats = ht.enable_stats()
+
+    print(f"{'operations':>12} {'size':>8} {'capacity':>10} {'deleted':>8} {'probes':>8} {'time (s)':>10}")
+    checkpoint = max(1, operations // 10)
+    start = time.monotonic()
+    for i in range(1, operations + 1):
+        op = i % 3
+        if op == 0:
+            key = random.getrandbits(62)
+            ht.set(key, key)
+            keys.append(key)
+        elif op == 1:
+            # Swap-remove a random live key
+            j = random.randrange(len(keys))
+            keys[j], keys[-1] = keys[-1], keys[j]
+            ht.delete(keys.pop())
+        else:
+            ht.get(keys[random.randrange(len(keys))])
+
+        if i % checkpoint == 0:
+            print(f"{i:>12} {ht.size:>8} {ht.capacity:>10} {ht.deleted:>8} "
+                  f"{ht.average_probe_length():>8.3f} {time.monotonic() - start:>10.2f}")
+    print(stats.report(ht))
+
+
+def measure(table_class, keys):
+    # Memory held by the table alone (the keys are allocated beforehand)
+    tracemalloc.start()
+    ht = table_class()
+    for key in keys:
+        ht.set(key, None)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del ht
+
+    start = time.monotonic()
+    ht = table_class()
+    for key in keys:
+        ht.set(key, None)
+    set_time = time.monotonic() - start
+
+    start = time.monotonic()
+    for key in keys:
+        ht.get(key)
+    get_time = time.monotonic() - start
+    return memory, set_time, get_time
+
+
+def compact(n=1_000_000):
+    # HashTable against CompactHashTable, with integer and string keys
+    int_keys = random.sample(range(10 * n), n)
+    str_keys = [f"key-{key}" for key in int_keys]
+
+    print(f"{'table':>18} {'keys':>6} {'memory (MB)':>12} {'set (s)':>8} {'get (s)':>8}")
+    for name, keys in (("int", int_keys), ("str", str_keys)):
+        for table_class in (HashTable, CompactHashTable):
+            memory, set_time, get_time = measure(table_class, keys)
+            print(f"{table_class.__name__:>18} {name:>6} {memory / 2 ** 20:>12.1f} {set_time:>8.2f} {get_time:>8.2f}")
+
+
+def probing(n=100_000):
+    # Probe lengths of every probing strategy, with sequential integer keys
+    # (the worst case of linear probing) and random string keys
+    workloads = (("sequential", list(range(n))),
+                 ("random", [str(random.getrandbits(60)) for _ in range(n)]))
+
+    print(f"{'probing':>12} {'keys':>10} {'average':>8} {'max':>6} {'set (s)':>8} {'get (s)':>8}")
+    for name, keys in workloads:
+        for strategy in PROBING:
+            ht = make_hash_table(probing=strategy)
+            start = time.monotonic()
+            for key in keys:
+                ht.set(key, key)
+            set_time = time.monotonic() - start
+
+            start = time.monotonic()
+            for key in keys:
+                ht.get(key)
+            get_time = time.monotonic() - start
+
+            lengths = ht.probe_lengths()
+            print(f"{strategy:>12} {name:>10} {sum(lengths) / len(lengths):>8.3f} {max(lengths):>6} "
+                  f"{set_time:>8.2f} {get_time:>8.2f}")
+
+
+class LockedHashTable(HashTable):
+    # Baseline for the concurrent benchmark: one lock for the whole table
+    def __init__(self, capacity=10):
+        super().__init__(capacity)
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return super().get(key, default)
+
+    def set(self, key, value):
+        with self.lock:
+            super().set(key, value)
+
+    def delete(self, key):
+        with self.lock:
+            super().delete(key)
+
+
+def concurrent(threads=8, operations=200_000):
+    # Every thread owns a range of keys that it inserts, reads back and
+    # partly deletes, while also reading the keys of the other threads.
+    # A read must never return a wrong value, and at the end the table must
+    # hold exactly the keys that were not deleted.
+    print(f"{'table':>20} {'threads':>8} {'operations/s':>14} {'correct':>8}")
+    for table_class in (LockedHashTable, ConcurrentHashTable):
+        ht = table_class()
+        errors = []
+        kept = [set() for _ in range(threads)]
+
+        def worker(t):
+            rng = random.Random(t)
+            first = last = t * operations
+            for i in range(operations):
+                op = i % 4
+                if op == 0:
+                    ht.set(last, last)
+                    kept[t].add(last)
+                    last += 1
+                elif op == 1:
+                    key = rng.randrange(first, last)
+                    if ht.get(key, key) != key:
+                        errors.append(key)
+                elif op == 2 and last % 3 == 0:
+                    ht.delete(last - 1)
+                    kept[t].discard(last - 1)
+                else:
+                    ht.get(rng.randrange(threads * operations))
+
+        start = time.monotonic()
+        workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        correct = not errors and sorted(ht.keys()) == sorted(set().union(*kept))
+        print(f"{table_class.__name__:>20} {threads:>8} {threads * operations / elapsed:>14.0f} {str(correct):>8}")
+
+
+def batch(n=1_000_000):
+    # get_many / set_many against loops of get / set, for several batch sizes
+    keys = [str(random.getrandbits(60)) for _ in range(n)]
+
+    print(f"{'batch':>8} {'set loop (s)':>13} {'set_many (s)':>13} {'get loop (s)':>13} {'get_many (s)':>13}")
+    for size in (8, 64, 1024, n):
+        batches = [keys[i:i + size] for i in range(0, n, size)]
+
+        ht = HashTable()
+        start = time.monotonic()
+        for keys_batch in batches:
+            for key in keys_batch:
+                ht.set(key, key)
+        set_loop = time.monotonic() - start
+
+        start = time.monotonic()
+        for keys_batch in batches:
+            [ht.get(key) for key in keys_batch]
+        get_loop = time.monotonic() - start
+
+        ht = HashTable()
+        start = time.monotonic()
+        for keys_batch in batches:
+            ht.set_many([(key, key) for key in keys_batch])
+        set_many = time.monotonic() - start
+
+        start = time.monotonic()
+        for keys_batch in batches:
+            ht.get_many(keys_batch)
+        get_many = time.monotonic() - start
+
+        print(f"{size:>8} {set_loop:>13.2f} {set_many:>13.2f} {get_loop:>13.2f} {get_many:>13.2f}")
+
+
+def cuckoo(n=200_000):
+    # Worst-case lookups: probes of the slowest get, with the same workloads
+    # as the probing benchmark
+    workloads = (("sequential", list(range(n))),
+                 ("random", [str(random.getrandbits(60)) for _ in range(n)]))
+    tables = (("linear", HashTable), ("robin_hood", lambda: make_hash_table(probing='robin_hood')),
+              ("cuckoo 2", CuckooHashTable), ("cuckoo 3", lambda: CuckooHashTable(ways=3)))
+
+    print(f"{'table':>12} {'keys':>10} {'average':>8} {'max':>6} {'capacity':>10} {'set (s)':>8} {'get (s)':>8}")
+    for name, keys in workloads:
+        for table_name, table_class in tables:
+            ht = table_class()
+            start = time.monotonic()
+            for key in keys:
+                ht.set(key, key)
+            set_time = time.monotonic() - start
+
+            stats = ht.enable_stats()
+            start = time.monotonic()
+            for key in keys:
+                ht.get(key)
+            get_time = time.monotonic() - start
+            print(f"{table_name:>12} {name:>10} {stats.average_probes(GET):>8.3f} {stats.max_probes(GET):>6} "
+                  f"{ht.capacity:>10} {set_time:>8.2f} {get_time:>8.2f}")
+
+
+if __name__ == "__main__":
+    benchmark = sys.argv[1] if len(sys.argv) > 1 else "churn"
+    args = [int(arg) for arg in sys.argv[2:]]
+
+    if benchmark == "churn":
+        churn(*args)
+    elif benchmark == "compact":
+        compact(*args)
+    elif benchmark == "probing":
+        probing(*args)
+    elif benchmark == "concurrent":
+        concurrent(*args)
+    elif benchmark == "batch":
+        batch(*args)
+    elif benchmark == "cuckoo":
+        cuckoo(*args)
+    else:
+        print(f"Unknown benchmark: {benchmark}")
+        sys.exit(1)
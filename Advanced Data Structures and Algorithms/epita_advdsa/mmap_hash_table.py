@@ -0,0 +1,221 @@
+# ---------- On-disk Hash Table using Linear Probing ----------
+# Description: Hash table stored in a file of fixed-width slots, accessed
+# through mmap. Opening a prebuilt table only maps the file (nothing is read
+# or parsed), and a table opened read-only can be shared by several processes
+# since they all map the same pages.
+
+# structure: header, then m slots of (state, key, value)
+#            header: magic, capacity, size, deleted, key size, value size
+#            state:  EMPTY_SLOT, USED_SLOT or DELETED_SLOT (1 byte)
+#            key:    utf-8 string padded with zero bytes to key_size bytes
+#            value:  utf-8 string padded with zero bytes to value_size bytes
+# Number of pairs: n
+# Capacity of the hash table: m (number of slots)
+#
+# The slot of a key uses crc32 instead of hash(): hash() of a string changes
+# from one process to the other, the file must not.
+
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b'EPITAHT1'
+HEADER = struct.Struct('<8sQQQII')
+
+# Smallest capacity: the load factor is checked before an insertion, so a
+# table of 1 or 2 slots could get all of them used, and find() would then
+# never reach an empty slot
+MIN_CAPACITY = 4
+
+EMPTY_SLOT = 0
+USED_SLOT = 1
+DELETED_SLOT = 2
+
+
+class MmapHashTable:
+    def __init__(self, path, readonly=True):
+        self.path = path
+        self.readonly = readonly
+        self.max_load_factor = 0.5
+        self.max_deleted_factor = 0.25
+        self.mm = None
+        self.file = open(path, 'rb' if readonly else 'r+b')
+        try:
+            # mmap raises ValueError for an empty file
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+            if len(self.mm) < HEADER.size:
+                raise ValueError(f"{path} is not a hash table file")
+            magic, self.capacity, self.size, self.deleted, self.key_size, self.value_size = HEADER.unpack_from(self.mm, 0)
+            if magic != MAGIC or self.capacity < MIN_CAPACITY:
+                raise ValueError(f"{path} is not a hash table file")
+            self.slot_size = 1 + self.key_size + self.value_size
+            if len(self.mm) < self.offset(self.capacity):
+                raise ValueError(f"{path} is truncated")
+        except Exception:
+            # Nothing stays open when the file cannot be used
+            self.close()
+            raise
+
+    @classmethod
+    def create(cls, path, capacity=10, key_size=32, value_size=32):
+        if capacity < MIN_CAPACITY:
+            raise ValueError(f"A hash table file needs at least {MIN_CAPACITY} slots")
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, capacity, 0, 0, key_size, value_size))
+            file.truncate(HEADER.size + capacity * (1 + key_size + value_size))
+        return cls(path, readonly=False)
+
+    def __str__(self):
+        return f"MmapHashTable<{self.path}, {self.capacity}, {self.size}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.mm is not None:
+            if not self.readonly:
+                self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        self.file.close()
+
+    def load_factor(self):
+        return (self.size + self.deleted) / self.capacity
+
+    def encode(self, text, size):
+        data = text.encode()
+        if len(data) > size:
+            raise ValueError(f"{text!r} does not fit in {size} bytes")
+        return data.ljust(size, b'\0')
+
+    def offset(self, index):
+        return HEADER.size + index * self.slot_size
+
+    def find(self, key):
+        # Slot of the key, or None
+        data = self.encode(key, self.key_size)
+        index = zlib.crc32(data) % self.capacity
+        while True:
+            offset = self.offset(index)
+            state = self.mm[offset]
+            if state == EMPTY_SLOT:
+                return None
+            if state == USED_SLOT and self.mm[offset + 1:offset + 1 + self.key_size] == data:
+                return index
+            index = (index + 1) % self.capacity
+
+    def read_slot(self, index):
+        offset = self.offset(index) + 1
+        key = self.mm[offset:offset + self.key_size].rstrip(b'\0').decode()
+        offset += self.key_size
+        value = self.mm[offset:offset + self.value_size].rstrip(b'\0').decode()
+        return key, value
+
+    def contains(self, key):
+        return self.find(key) is not None
+
+    def get(self, key, default=None):
+        index = self.find(key)
+        if index is None:
+            return default
+        return self.read_slot(index)[1]
+
+    def items(self):
+        return [self.read_slot(index) for index in range(self.capacity) if self.mm[self.offset(index)] == USED_SLOT]
+
+    def keys(self):
+        return [pair[0] for pair in self.items()]
+
+    def values(self):
+        return [pair[1] for pair in self.items()]
+
+    def check_writable(self):
+        if self.readonly:
+            raise ValueError(f"{self.path} is opened read-only")
+
+    def write_header(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, self.capacity, self.size, self.deleted, self.key_size, self.value_size)
+
+    def set(self, key, value):
+        self.check_writable()
+        if self.load_factor() > self.max_load_factor:
+            if self.size / self.capacity > self.max_load_factor / 2:
+                self.grow()
+            else:
+                self.rehash(self.capacity)
+
+        data = self.encode(key, self.key_size)
+        value_data = self.encode(value, self.value_size)
+        index = zlib.crc32(data) % self.capacity
+        tombstone = None
+        while True:
+            offset = self.offset(index)
+            state = self.mm[offset]
+            if state == EMPTY_SLOT:
+                if tombstone is not None:
+                    offset = self.offset(tombstone)
+                    self.deleted -= 1
+                self.size += 1
+                break
+            if state == DELETED_SLOT:
+                if tombstone is None:
+                    tombstone = index
+            elif self.mm[offset + 1:offset + 1 + self.key_size] == data:
+                break
+            index = (index + 1) % self.capacity
+
+        self.mm[offset:offset + self.slot_size] = bytes([USED_SLOT]) + data + value_data
+        self.write_header()
+
+    def delete(self, key):
+        self.check_writable()
+        index = self.find(key)
+        if index is None:
+            return
+        self.mm[self.offset(index)] = DELETED_SLOT
+        self.size -= 1
+        self.deleted += 1
+        self.write_header()
+        if self.deleted > self.capacity * self.max_deleted_factor:
+            self.rehash(self.capacity)
+
+    def grow(self, factor=2):
+        self.rehash(self.capacity * factor)
+
+    def rehash(self, capacity):
+        # Copy the pairs into a new file, then swap the files
+        self.check_writable()
+        pairs = self.items()
+        temporary = self.path + '.tmp'
+        new = MmapHashTable.create(temporary, capacity, self.key_size, self.value_size)
+        for key, value in pairs:
+            new.set(key, value)
+        new.close()
+        self.close()
+        os.replace(temporary, self.path)
+        self.__init__(self.path, readonly=False)
+
+    def display(self):
+        print(f"MmapHashTable[{', '.join(str(pair) for pair in self.items())}]")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    path = os.path.join(tempfile.gettempdir(), 'cities.ht')
+    with MmapHashTable.create(path, key_size=16, value_size=16) as ht:
+        ht.set("Paris", "-190 640")
+        ht.set("Lyon", "290 -215")
+        ht.set("Nice", "810 -790")
+        ht.delete("Lyon")
+
+    # Later, or from another process: no parsing, only a mapping of the file
+    with MmapHashTable(path) as ht:
+        print(ht.get("Paris"))  # -190 640
+        print(ht.get("Lyon"))  # None
+        ht.display()
+    os.remove(path)
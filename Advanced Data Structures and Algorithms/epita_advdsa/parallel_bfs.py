@@ -0,0 +1,178 @@
+# ---------- Parallel multi-source BFS ----------
+# Description: Number of edges from each of several sources to every node of
+# a Graph, computed level by level: all the nodes at distance d (of every
+# source at once) form the frontier, and expanding it gives the nodes at
+# distance d + 1. A large frontier is cut in chunks expanded by a pool of
+# processes that all see the graph and the distances in shared memory; a
+# small one is expanded by the main process, where the pool would cost more
+# than it saves. Graph.breadth_first gives the same distances on one source
+# in one process, and is used to check the results.
+# Usage: python parallel_bfs.py [nodes] [sources] [processes]
+
+# structure: offsets, targets: CSR adjacency of the dense ids of
+#                              Graph.index() (the neighbors of v are
+#                              targets[offsets[v] .. offsets[v + 1] - 1])
+#            distances:        S * V int32, distances[s * V + v] = distance
+#                              from source s to node v, -1 if not reached
+#            frontier:         list of the positions s * V + v reached at
+#                              the last level
+# Two processes may both reach the same node in the same level; they write
+# the same distance, and the node is then expanded twice, which gives the
+# same result again.
+
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+# Frontiers smaller than this are expanded by the main process
+PARALLEL_THRESHOLD = 4096
+
+# (shared blocks, [offsets, targets, distances], V) in a worker process,
+# set by attach
+worker = None
+
+
+def csr(graph):
+    # offsets and targets arrays of the adjacency lists of graph.index()
+    _, _, adjacency = graph.index()
+    offsets = array('q', [0])
+    targets = array('q')
+    for neighbors in adjacency:
+        targets.extend(neighbors)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def share(values):
+    # Shared memory block holding a copy of an array; an empty array still
+    # gets one item, so that the block can be cast to its type
+    memory = shared_memory.SharedMemory(create=True, size=max(1, len(values)) * values.itemsize)
+    memory.buf[:len(values) * values.itemsize] = values.tobytes()
+    return memory
+
+
+def view(memory, typecode, count):
+    return memory.buf.cast(typecode)[:count]
+
+
+def attach(names, counts, size):
+    # Pool initializer: the shared blocks of the main process, by name
+    global worker
+    memories = [shared_memory.SharedMemory(name=name) for name in names]
+    views = [view(memory, typecode, count) for memory, typecode, count in zip(memories, 'qqi', counts)]
+    worker = (memories, views, size)
+
+
+def expand(frontier, level, offsets, targets, distances, size):
+    # Positions s * V + v first reached from the positions of frontier,
+    # which are all at distance level
+    following = []
+    for position in frontier:
+        base = position - position % size
+        vertex = position - base
+        for i in range(offsets[vertex], offsets[vertex + 1]):
+            reached = base + targets[i]
+            if distances[reached] < 0:
+                distances[reached] = level + 1
+                following.append(reached)
+    return following
+
+
+def expand_chunk(chunk, level):
+    _, (offsets, targets, distances), size = worker
+    return expand(chunk, level, offsets, targets, distances, size)
+
+
+def multi_source_bfs(graph, sources, processes=1):
+    # List of one array per source: distance (number of edges) from the
+    # source to every node, in the order of graph.index()[0], -1 when it
+    # cannot be reached. processes=0 uses one process per CPU
+    names, ids, _ = graph.index()
+    size = len(names)
+    offsets, targets = csr(graph)
+    distances = array('i', [-1]) * (len(sources) * size)
+    frontier = []
+    for s, source in enumerate(sources):
+        vertex = ids.get(source)
+        if vertex is None:
+            raise KeyError(source)
+        distances[s * size + vertex] = 0
+        frontier.append(s * size + vertex)
+
+    if processes == 1:
+        level = 0
+        while frontier:
+            frontier = expand(frontier, level, offsets, targets, distances, size)
+            level += 1
+        return [distances[s * size:(s + 1) * size] for s in range(len(sources))]
+
+    if not sources:
+        # Nothing to share with the processes
+        return []
+    processes = processes or multiprocessing.cpu_count()
+    counts = [len(offsets), len(targets), len(distances)]
+    memories = []
+    views = []
+    try:
+        for values in (offsets, targets, distances):
+            memories.append(share(values))
+        for memory, typecode, count in zip(memories, 'qqi', counts):
+            views.append(view(memory, typecode, count))
+        with multiprocessing.Pool(processes, attach, ([memory.name for memory in memories], counts, size)) as pool:
+            level = 0
+            while frontier:
+                if len(frontier) < PARALLEL_THRESHOLD:
+                    frontier = expand(frontier, level, *views, size)
+                else:
+                    # A few chunks per process, so that a slow chunk does
+                    # not leave the other processes waiting
+                    step = -(-len(frontier) // (4 * processes))
+                    chunks = [(frontier[i:i + step], level) for i in range(0, len(frontier), step)]
+                    frontier = [position for following in pool.starmap(expand_chunk, chunks)
+                                for position in following]
+                level += 1
+        result = array('i', views[2].tobytes())
+    finally:
+        for values in views:
+            values.release()
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+    return [result[s * size:(s + 1) * size] for s in range(len(sources))]
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    from graph import Graph
+
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    # Random graph with about 3 edges per node
+    rng = random.Random(0)
+    g = Graph(capacity=2 * nodes)
+    for i in range(nodes):
+        g.add_vertex(i)
+    for _ in range(3 * nodes):
+        g.add_edge(rng.randrange(nodes), rng.randrange(nodes))
+    sources = [rng.randrange(nodes) for _ in range(count)]
+    names, ids, _ = g.index()
+
+    # Expected distances: the single-source, single-process traversal
+    expected = []
+    for source in sources:
+        row = array('i', [-1]) * len(names)
+        for node, depth, _ in g.breadth_first(source):
+            row[ids.get(node)] = depth
+        expected.append(row)
+
+    for workers in (1, processes):
+        start = time.monotonic()
+        rows = multi_source_bfs(g, sources, workers)
+        print(f"{workers or multiprocessing.cpu_count()} processes: {time.monotonic() - start:.2f} s")
+        if rows != expected:
+            print("Different distances from Graph.breadth_first")
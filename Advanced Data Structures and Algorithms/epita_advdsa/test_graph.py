@@ -0,0 +1,74 @@
+import random
+import unittest
+
+from cuckoo_hash_table import CuckooHashTable
+from graph import Graph
+
+
+def fresh_index(graph):
+    # Index made from scratch from the adjacency lists of graph.ht, as
+    # (node, [neighbors]) pairs
+    copy = Graph(graph.directional)
+    copy.ht = graph.ht
+    names, _, adjacency = copy.index()
+    return sorted((name, sorted(names[i] for i in adjacency[vertex])) for vertex, name in enumerate(names))
+
+
+def current_index(graph):
+    names, _, adjacency = graph.index()
+    return sorted((name, sorted(names[i] for i in adjacency[vertex])) for vertex, name in enumerate(names))
+
+
+class TestIndex(unittest.TestCase):
+    def test_updated_by_changes(self):
+        for directional in (False, True):
+            rng = random.Random(0)
+            graph = Graph(directional)
+            for i in range(50):
+                graph.add_vertex(i)
+            graph.index()
+            for step in range(300):
+                if step % 10 == 0:
+                    graph.add_vertex(rng.randrange(60))
+                else:
+                    graph.add_edge(rng.randrange(50), rng.randrange(60 if directional else 50))
+                self.assertEqual(current_index(graph), fresh_index(graph))
+
+    def test_not_made_again(self):
+        graph = Graph()
+        graph.add_vertex('A')
+        graph.add_vertex('B')
+        ids = graph.index()[1]
+        graph.add_vertex('C')
+        graph.add_edge('A', 'C')
+        self.assertIs(graph.index()[1], ids)
+        self.assertEqual([node for node, _, _ in graph.breadth_first('C')], ['C', 'A'])
+
+    def test_table_class(self):
+        graphs = [Graph(), Graph(table_class=CuckooHashTable)]
+        rng = random.Random(0)
+        edges = [(rng.randrange(40), rng.randrange(40)) for _ in range(80)]
+        for graph in graphs:
+            for i in range(40):
+                graph.add_vertex(i)
+            for a, b in edges:
+                graph.add_edge(a, b)
+        self.assertIsInstance(graphs[1].ht, CuckooHashTable)
+        self.assertIsInstance(graphs[1].index()[1], CuckooHashTable)
+        self.assertEqual(current_index(graphs[1]), current_index(graphs[0]))
+        self.assertEqual(sorted(node for node, _, _ in graphs[1].breadth_first(0)),
+                         sorted(node for node, _, _ in graphs[0].breadth_first(0)))
+
+    def test_visited_buffer_grows(self):
+        graph = Graph()
+        graph.add_vertex('A')
+        visited = graph.visited_buffer()
+        graph.add_vertex('B')
+        graph.add_edge('A', 'B')
+        self.assertEqual([node for node, _, _ in graph.breadth_first('A', visited=visited)], ['A', 'B'])
+        self.assertEqual([node for node, _, _ in graph.depth_first('B', visited=visited)], ['B', 'A'])
+        self.assertEqual(visited, bytearray(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,336 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+from array import array
+from unittest import mock
+
+from compact_hash_table import EMPTY, CompactHashTable
+from cuckoo_hash_table import STASH_SIZE, CuckooHashTable
+from hash_table import DELETED, MIN_CAPACITY, PROBING, HashTable, RobinHoodHashTable, make_hash_table
+from mmap_hash_table import MIN_CAPACITY as MMAP_MIN_CAPACITY, MmapHashTable
+
+# Integers that are multiples of 2^61 - 1 all have hash() 0
+SAME_HASH = 2 ** 61 - 1
+
+
+def fuzz(test, ht, steps=3000, keys=200, seed=0, key=lambda i: i, value=lambda step: step):
+    # Random sets, deletes and gets, checked against a dict after each step
+    rng = random.Random(seed)
+    expected = {}
+    for step in range(steps):
+        k = key(rng.randrange(keys))
+        action = rng.random()
+        if action < 0.5:
+            ht.set(k, value(step))
+            expected[k] = value(step)
+        elif action < 0.8:
+            ht.delete(k)
+            expected.pop(k, None)
+        else:
+            test.assertEqual(ht.get(k), expected.get(k))
+        test.assertEqual(ht.size, len(expected))
+    test.assertEqual(sorted(ht.items()), sorted(expected.items()))
+    for k in map(key, range(keys)):
+        test.assertEqual(ht.contains(k), k in expected)
+    return expected
+
+
+class TestHashTable(unittest.TestCase):
+    def test_fuzz(self):
+        fuzz(self, HashTable())
+        fuzz(self, HashTable(), key=str, value=str, seed=1)
+
+    def test_tiny_capacity(self):
+        self.assertEqual(HashTable(1).capacity, MIN_CAPACITY)
+        fuzz(self, HashTable(1), keys=20)
+        fuzz(self, HashTable(2), keys=5, seed=1)
+
+    def test_tombstone_reused(self):
+        # 1, 17 and 33 all start at slot 1 of 16
+        ht = HashTable(16)
+        for key in (1, 17, 33):
+            ht.set(key, key)
+        ht.delete(17)
+        self.assertIs(ht.table[2], DELETED)
+        self.assertEqual(ht.deleted, 1)
+        ht.set(49, 49)
+        self.assertEqual(ht.table[2], (49, 49))
+        self.assertEqual(ht.deleted, 0)
+        self.assertEqual(ht.size, 3)
+
+    def test_delete_at_end_of_cluster(self):
+        ht = HashTable(16)
+        for key in (1, 17, 33):
+            ht.set(key, key)
+        ht.delete(17)
+        # The end of the cluster: no tombstone, and the one before goes too
+        ht.delete(33)
+        self.assertEqual(ht.table[1:4], [(1, 1), None, None])
+        self.assertEqual(ht.deleted, 0)
+
+    def test_move_on_get(self):
+        ht = HashTable(16)
+        for key in (1, 17, 33):
+            ht.set(key, key)
+        ht.delete(1)
+        self.assertEqual(ht.get(33), 33)
+        # Moved into the first tombstone of its probe sequence
+        self.assertEqual(ht.table[1], (33, 33))
+        self.assertIs(ht.table[3], DELETED)
+        self.assertEqual(ht.deleted, 1)
+        self.assertEqual(ht.get(17), 17)
+
+    def test_shrink(self):
+        ht = HashTable(8)
+        for key in range(100):
+            ht.set(key, key)
+        largest = ht.capacity
+        for key in range(98):
+            ht.delete(key)
+        self.assertLess(ht.capacity, largest)
+        self.assertGreaterEqual(ht.capacity, ht.min_capacity)
+        self.assertGreaterEqual(ht.size, ht.capacity * ht.min_load_factor)
+        self.assertEqual(sorted(ht.items()), [(98, 98), (99, 99)])
+
+
+class CountedKey:
+    # Key that counts the calls of its __hash__
+    calls = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        CountedKey.calls += 1
+        return hash(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, CountedKey) and self.value == other.value
+
+
+class TestCompactHashTable(unittest.TestCase):
+    def test_fuzz(self):
+        fuzz(self, CompactHashTable())
+        fuzz(self, CompactHashTable(), key=str, value=str, seed=1)
+        # Negative hashes: hash(-1) is -2, as hash(-2)
+        fuzz(self, CompactHashTable(), key=lambda i: -i, seed=2)
+
+    def test_tiny_capacity(self):
+        fuzz(self, CompactHashTable(1), keys=20)
+
+    def test_layout(self):
+        ht = CompactHashTable(16)
+        for key in (1, 17, -3, "text"):
+            ht.set(key, str(key))
+        self.assertIsNone(ht.table)
+        self.assertIsInstance(ht.hashes, array)
+        self.assertEqual(ht.hashes.typecode, 'q')
+        self.assertEqual(len(ht.hashes), ht.capacity)
+        self.assertEqual(len(ht.keys_array), ht.capacity)
+        self.assertEqual(len(ht.values_array), ht.capacity)
+        for index, key in enumerate(ht.keys_array):
+            if key is not EMPTY:
+                self.assertEqual(ht.hashes[index], hash(key))
+                self.assertEqual(ht.values_array[index], str(key))
+
+    def test_delete_at_end_of_cluster(self):
+        ht = CompactHashTable(16)
+        for key in (1, 17, 33):
+            ht.set(key, key)
+        ht.delete(17)
+        self.assertIs(ht.keys_array[2], DELETED)
+        ht.delete(33)
+        self.assertEqual(ht.keys_array[1:4], [1, EMPTY, EMPTY])
+        self.assertEqual(ht.deleted, 0)
+
+    def test_rebuild_uses_cached_hashes(self):
+        ht = CompactHashTable(4)
+        keys = [CountedKey(i) for i in range(100)]
+        CountedKey.calls = 0
+        for key in keys:
+            ht.set(key, key.value)
+        # One hash per set, none for the grows on the way
+        self.assertEqual(CountedKey.calls, 100)
+        self.assertEqual(ht.get(CountedKey(42)), 42)
+
+
+class TestMmapHashTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'table.ht')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fuzz(self):
+        with MmapHashTable.create(self.path, key_size=8, value_size=8) as ht:
+            expected = fuzz(self, ht, steps=1500, keys=100, key=str, value=str)
+        # Everything is in the file: open it again
+        with MmapHashTable(self.path) as ht:
+            self.assertEqual(sorted(ht.items()), sorted(expected.items()))
+            self.assertEqual(ht.size, len(expected))
+
+    def test_reopen(self):
+        with MmapHashTable.create(self.path, capacity=4, key_size=8, value_size=8) as ht:
+            for i in range(20):
+                ht.set(f"key{i}", f"value{i}")
+            ht.delete("key3")
+        with MmapHashTable(self.path, readonly=False) as ht:
+            self.assertEqual(ht.size, 19)
+            self.assertIsNone(ht.get("key3"))
+            self.assertEqual(ht.get("key19"), "value19")
+            ht.set("key3", "again")
+        with MmapHashTable(self.path) as ht:
+            self.assertEqual(ht.get("key3"), "again")
+            self.assertEqual(len(ht.items()), 20)
+            with self.assertRaises(ValueError):
+                ht.set("key20", "value20")
+
+    def test_not_a_table(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'something else' * 10)
+        with self.assertRaises(ValueError):
+            MmapHashTable(self.path)
+
+    def test_damaged_file(self):
+        with MmapHashTable.create(self.path, key_size=8, value_size=8) as ht:
+            ht.set("key", "value")
+        size = os.path.getsize(self.path)
+        for length in (0, 10, size - 1):
+            with open(self.path, 'r+b') as file:
+                file.truncate(length)
+            files = []
+
+            def tracked_open(*args):
+                files.append(io.open(*args))
+                return files[-1]
+
+            with mock.patch('mmap_hash_table.open', tracked_open, create=True):
+                with self.assertRaises(ValueError):
+                    MmapHashTable(self.path, readonly=False)
+            self.assertTrue(files[0].closed)
+
+    def test_tiny_capacity(self):
+        for capacity in (0, 1, 2, 3):
+            with self.assertRaises(ValueError):
+                MmapHashTable.create(self.path, capacity=capacity)
+        with MmapHashTable.create(self.path, capacity=MMAP_MIN_CAPACITY, key_size=4, value_size=4) as ht:
+            fuzz(self, ht, steps=300, keys=10, key=str, value=str)
+
+    def test_too_long(self):
+        with MmapHashTable.create(self.path, key_size=4, value_size=4) as ht:
+            with self.assertRaises(ValueError):
+                ht.set("too long", "x")
+            self.assertEqual(ht.size, 0)
+
+
+class TestProbing(unittest.TestCase):
+    def test_strategies(self):
+        for probing in PROBING:
+            ht = make_hash_table(8, probing)
+            ht.set("key", "value")
+            self.assertEqual(ht.get("key"), "value")
+        self.assertIsInstance(make_hash_table(8, 'robin_hood'), RobinHoodHashTable)
+
+    def test_fuzz(self):
+        for seed, probing in enumerate(PROBING):
+            fuzz(self, make_hash_table(10, probing), seed=seed)
+            fuzz(self, make_hash_table(1, probing), keys=20, seed=seed)
+            fuzz(self, make_hash_table(10, probing), key=str, value=str, seed=seed)
+
+    def test_power_of_two(self):
+        for probing in ('quadratic', 'double'):
+            ht = HashTable(10, probing)
+            self.assertEqual(ht.capacity, 16)
+            for key in range(100):
+                ht.set(key, key)
+            self.assertEqual(ht.capacity & (ht.capacity - 1), 0)
+
+    def test_robin_hood_distances(self):
+        ht = RobinHoodHashTable()
+        fuzz(self, ht, seed=3)
+        for index, pair in enumerate(ht.table):
+            self.assertIsNot(pair, DELETED)
+            if pair is not None:
+                self.assertEqual(ht.distances[index], (index - hash(pair[0]) % ht.capacity) % ht.capacity)
+        self.assertEqual(ht.deleted, 0)
+
+    def test_robin_hood_backward_shift(self):
+        # 1, 17 and 33 all start at slot 1 of 16
+        ht = RobinHoodHashTable(16)
+        for key in (1, 17, 33):
+            ht.set(key, key)
+        self.assertEqual(ht.distances[1:4], [0, 1, 2])
+        ht.delete(1)
+        # The rest of the cluster moves back by one slot, no tombstone
+        self.assertEqual(ht.table[1:4], [(17, 17), (33, 33), None])
+        self.assertEqual(ht.distances[1:4], [0, 1, 0])
+        # Deleting the end of a cluster only empties its slot
+        ht.delete(33)
+        self.assertEqual(ht.table[1:3], [(17, 17), None])
+        self.assertEqual(ht.get(33), None)
+
+    def test_robin_hood_constructor(self):
+        with self.assertRaisesRegex(ValueError, "make_hash_table"):
+            HashTable(8, 'robin_hood')
+        with self.assertRaisesRegex(ValueError, "Unknown probing"):
+            HashTable(8, 'cubic')
+
+
+class TestCuckooHashTable(unittest.TestCase):
+    def test_fuzz(self):
+        for ways in (2, 3):
+            fuzz(self, CuckooHashTable(ways=ways), seed=ways)
+            fuzz(self, CuckooHashTable(ways=ways), key=str, value=str, seed=ways)
+            fuzz(self, CuckooHashTable(1, ways=ways), keys=20, seed=ways)
+
+    def test_bounded_lookups(self):
+        ht = CuckooHashTable()
+        for key in range(2000):
+            ht.set(key, key)
+        self.assertLessEqual(len(ht.stash), STASH_SIZE)
+        self.assertLessEqual(ht.max_probe_length(), ht.ways + STASH_SIZE)
+        stats = ht.enable_stats()
+        for key in range(4000):
+            ht.get(key)
+        self.assertLessEqual(stats.max_probes(0), ht.ways + len(ht.stash))
+
+    def test_stash(self):
+        # Keys of one hash have one slot per way: the others go to the stash
+        ht = CuckooHashTable(4)
+        ht.max_load_factor = 1
+        ht.max_kicks = 1
+        for key in range(4):
+            ht.set(key * SAME_HASH, key)
+        self.assertEqual(len(ht.stash), 2)
+        self.assertEqual([ht.get(key * SAME_HASH) for key in range(4)], [0, 1, 2, 3])
+        # A freed slot takes back a stashed pair
+        table_key = next(pair[0] for pair in ht.table if pair is not None)
+        ht.delete(table_key)
+        self.assertEqual(len(ht.stash), 1)
+        self.assertEqual(ht.size, 3)
+
+    def test_same_hash_mixed(self):
+        # A few keys of one hash among ordinary keys
+        fuzz(self, CuckooHashTable(), key=lambda i: i * SAME_HASH if i % 10 == 0 else i, seed=4)
+
+    def test_same_hash(self):
+        # More keys with one hash than the slots and stash can hold: no
+        # rebuild can separate them, the stash grows instead
+        ht = CuckooHashTable()
+        for i in range(8):
+            ht.set(i * SAME_HASH, i)
+        self.assertEqual(ht.size, 8)
+        self.assertEqual([ht.get(i * SAME_HASH) for i in range(8)], list(range(8)))
+        self.assertGreater(ht.stash_size, STASH_SIZE)
+        self.assertLessEqual(ht.capacity, 64)
+        for i in range(8):
+            ht.delete(i * SAME_HASH)
+        self.assertEqual(ht.size, 0)
+        self.assertEqual(ht.items(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import random
+import unittest
+from array import array
+from multiprocessing import shared_memory
+from unittest import mock
+
+import parallel_bfs
+from graph import Graph
+from parallel_bfs import multi_source_bfs
+
+
+def expected_distances(graph, source):
+    names, ids, _ = graph.index()
+    row = array('i', [-1]) * len(names)
+    for node, depth, _ in graph.breadth_first(source):
+        row[ids.get(node)] = depth
+    return row
+
+
+class TestMultiSourceBFS(unittest.TestCase):
+    def test_no_edges(self):
+        graph = Graph()
+        for node in 'ABC':
+            graph.add_vertex(node)
+        for processes in (1, 2):
+            self.assertEqual(multi_source_bfs(graph, ['B'], processes), [expected_distances(graph, 'B')])
+
+    def test_no_sources(self):
+        graph = Graph()
+        graph.add_vertex('A')
+        graph.add_vertex('B')
+        graph.add_edge('A', 'B')
+        for processes in (1, 2):
+            self.assertEqual(multi_source_bfs(graph, [], processes), [])
+
+    def test_processes(self):
+        rng = random.Random(0)
+        graph = Graph()
+        for i in range(300):
+            graph.add_vertex(i)
+        for _ in range(600):
+            graph.add_edge(rng.randrange(300), rng.randrange(300))
+        sources = [rng.randrange(300) for _ in range(4)]
+        expected = [expected_distances(graph, source) for source in sources]
+        # Every level through the pool
+        with mock.patch.object(parallel_bfs, 'PARALLEL_THRESHOLD', 1):
+            self.assertEqual(multi_source_bfs(graph, sources, 2), expected)
+
+    def test_blocks_freed_on_error(self):
+        graph = Graph()
+        graph.add_vertex('A')
+        created = []
+
+        def share(values):
+            # The second block cannot be made
+            if created:
+                raise OSError("no space left")
+            memory = shared_memory.SharedMemory(create=True, size=8)
+            created.append(memory.name)
+            return memory
+
+        with mock.patch.object(parallel_bfs, 'share', share):
+            with self.assertRaises(OSError):
+                multi_source_bfs(graph, ['A'], 2)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=created[0])
+
+
+if __name__ == "__main__":
+    unittest.main()